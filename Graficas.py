@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
+from esquema_mio import aplicar_esquema
 
 
 
@@ -11,7 +12,7 @@ import pandas as pd
 class VisualizacionesMIO:
 
     def __init__(self, df):
-        self.df = df.copy()
+        self.df = aplicar_esquema(df.copy())
         self.df["Fecha"] = pd.to_datetime(self.df["Fecha"]).dt.date
 
     # ------------------------------
@@ -30,7 +31,7 @@ class VisualizacionesMIO:
    
     def obtener_colapsos(self, fecha=None, estacion=None):
         df = self.filtrar(fecha, estacion)
-        return df[df["Estado_Previsto"].str.contains("Colapsará", case=False, na=False)]
+        return df[df["Estado_Previsto"] == "Colapsará"]
 
 
     # GRÁFICO ESTADO GENERAL (POR DÍA)
@@ -38,6 +39,7 @@ class VisualizacionesMIO:
     def grafico_estado_general(self, fecha=None):
         df = self.filtrar(fecha)
         conteo = df["Estado_Previsto"].value_counts()
+        conteo = conteo[conteo > 0]
 
         fig, ax = plt.subplots(figsize=(6, 6))
         ax.pie(conteo.values, labels=conteo.index, autopct="%1.1f%%", startangle=90)
@@ -55,7 +57,7 @@ class VisualizacionesMIO:
 
         # Agrupar y obtener el top 10
         top_colapso = (
-            df.groupby(["Terminal", "Franja Horaria"])["Prob_Colapso"]
+            df.groupby(["Terminal", "Franja Horaria"], observed=True)["Prob_Colapso"]
             .mean()
             .sort_values(ascending=False)
             .head(10)
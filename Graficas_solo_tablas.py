@@ -10,13 +10,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import pandas as pd
+from esquema_mio import aplicar_esquema
 
 # CLASE QUE MANEJA SOLAMENTE TABLAS 
 
 class TablasMIO:
 
     def __init__(self, df):
-        self.df = df.copy()
+        self.df = aplicar_esquema(df.copy())
         self.df["Fecha"] = pd.to_datetime(self.df["Fecha"]).dt.date
 
     # Filtro general
@@ -31,7 +32,7 @@ class TablasMIO:
     # Solo colapsos
     def obtener_colapsos(self, fecha=None, estacion=None):
         df = self.filtrar(fecha, estacion)
-        return df[df["Estado_Previsto"].str.contains("Colapsará", case=False, na=False)]
+        return df[df["Estado_Previsto"] == "Colapsará"]
 
 
 
@@ -18,8 +18,16 @@ firebaseConfig = {
     "measurementId": "G-07JH7Y4RMZ"
 }
 
-firebase = pyrebase.initialize_app(firebaseConfig)
-auth = firebase.auth()
+_auth = None
+
+
+def obtener_auth():
+    """Inicializa Firebase la primera vez que se necesita (no al importar el módulo)"""
+    global _auth
+    if _auth is None:
+        firebase = pyrebase.initialize_app(firebaseConfig)
+        _auth = firebase.auth()
+    return _auth
 
 # -----------------------------------------------------
 # FUNCIONES DE VENTANAS SECUNDARIAS
@@ -80,7 +88,7 @@ def login_admin():
         email = entry_email.get()
         password = entry_password.get()
         try:
-            user = auth.sign_in_with_email_and_password(email, password)
+            user = obtener_auth().sign_in_with_email_and_password(email, password)
             messagebox.showinfo("Éxito", f"Bienvenido Administrador: {email}")
             login_win.destroy()
             ventana_admin()
@@ -103,7 +111,7 @@ def login_operario():
         email = entry_email.get()
         password = entry_password.get()
         try:
-            user = auth.sign_in_with_email_and_password(email, password)
+            user = obtener_auth().sign_in_with_email_and_password(email, password)
             messagebox.showinfo("Éxito", f"Bienvenido Operario: {email}")
             login_win.destroy()
             ventana_operario()
@@ -126,20 +134,17 @@ def login_operario():
 # -----------------------------------------------------
 def inicializar_sistema():
     
-    if not os.path.exists("predicciones_mio.xlsx"):
-        try:
-            from modelo_predictivo import ModeloPredictivoMIO_sklearn
-            modelo = ModeloPredictivoMIO_sklearn(usar_ultimo_mes=False, usar_random_forest=True)
-            modelo.entrenar_modelo_ocupacion()
-            modelo.entrenar_modelo_colapso()
-            df_pred = modelo.predecir(incluir_futuro=True, dias_futuros=5)
-            if df_pred is not None:
-                modelo.guardar_predicciones()
-                print("Archivo 'predicciones_mio.xlsx' generado exitosamente.")
-            else:
-                print("No se pudo generar el DataFrame de predicciones.")
-        except Exception as e:
-            print("Error generando predicciones:", e)
+    # Regenera solo si faltan las predicciones o cambiaron los datos/hiperparámetros;
+    # el modelo se carga de modelos_cache/ y solo se entrena si su versión no existe
+    try:
+        from pipeline_mio import ejecutar_todo
+        archivo = ejecutar_todo(dias_futuros=5, forzar=False)
+        if archivo is not None:
+            print(f"Archivo '{archivo}' listo.")
+        else:
+            print("No se pudo generar el DataFrame de predicciones.")
+    except Exception as e:
+        print("Error generando predicciones:", e)
 
 # -----------------------------------------------------
 # MENÚ PRINCIPAL
@@ -1,7 +1,10 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
 import matplotlib.pyplot as plt
+from esquema_mio import aplicar_esquema
+from instrumentacion_mio import instrumentar
 import webbrowser
 import os
 
@@ -20,13 +23,16 @@ from tkinter import ttk, messagebox
 # ==========================================================
 # 📌 FUNCIÓN PRINCIPAL: GENERAR REPORTE
 # ==========================================================
-def generar_reporte_por_dia(df_original, dia):
+@instrumentar(filas=lambda resultado, df_original, *args, **kwargs: len(df_original))
+def generar_reporte_por_dia(df_original, dia, mostrar=True):
+    """Genera el PDF del día; con mostrar=False no abre diálogos ni el navegador (benchmarks, lotes)"""
 
     df = df_original.copy()
 
     # Validar columna fecha
     if "Fecha" not in df.columns:
-        messagebox.showerror("Error", "El archivo no contiene columna 'Fecha'. Cambia el nombre.")
+        if mostrar:
+            messagebox.showerror("Error", "El archivo no contiene columna 'Fecha'. Cambia el nombre.")
         return
 
     df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
@@ -35,7 +41,8 @@ def generar_reporte_por_dia(df_original, dia):
     df = df[df["Fecha"].dt.day == dia]
 
     if df.empty:
-        messagebox.showwarning("Sin datos", f"No existen datos para el día {dia}.")
+        if mostrar:
+            messagebox.showwarning("Sin datos", f"No existen datos para el día {dia}.")
         return
 
     # ================================
@@ -45,7 +52,7 @@ def generar_reporte_por_dia(df_original, dia):
     total_registros = len(df)
 
     # Colapsos
-    colapsos = df[df["Estado_Previsto"].str.contains("Colapsará", case=False, na=False)]
+    colapsos = df[df["Estado_Previsto"] == "Colapsará"]
     cantidad_colapsos = len(colapsos)
     porcentaje_colapsos = (cantidad_colapsos / total_registros) * 100
 
@@ -63,6 +70,7 @@ def generar_reporte_por_dia(df_original, dia):
     # GRAFICO 1: ESTADO GENERAL
     plt.figure(figsize=(6, 6))
     conteo = df["Estado_Previsto"].value_counts()
+    conteo = conteo[conteo > 0]
     plt.pie(conteo, labels=conteo.index, autopct="%1.1f%%")
     plt.title("Estado General de Estaciones")
     plt.savefig("graficas/estado_general.png")
@@ -70,7 +78,7 @@ def generar_reporte_por_dia(df_original, dia):
 
     # GRAFICO 2: TOP 10 COLAPSOS
     top_colapso = (
-        df.groupby(["Terminal", "Franja Horaria"])["Prob_Colapso"]
+        df.groupby(["Terminal", "Franja Horaria"], observed=True)["Prob_Colapso"]
         .mean()
         .sort_values(ascending=False)
         .head(10)
@@ -106,7 +114,7 @@ def generar_reporte_por_dia(df_original, dia):
         tendencias.append("La ocupación promedio es BAJA para este día.")
 
     # TERMINAL MÁS RIESGOSA
-    top_riesgo = df.groupby("Terminal")["Prob_Colapso"].mean().sort_values(ascending=False)
+    top_riesgo = df.groupby("Terminal", observed=True)["Prob_Colapso"].mean().sort_values(ascending=False)
     estacion_riesgo = top_riesgo.index[0]
     riesgo_valor = top_riesgo.iloc[0] * 100
     tendencias.append(
@@ -115,7 +123,7 @@ def generar_reporte_por_dia(df_original, dia):
     )
 
     # FRANJA HORARIA MÁS CRÍTICA
-    franja_top = df.groupby("Franja Horaria")["Prob_Colapso"].mean().sort_values(ascending=False)
+    franja_top = df.groupby("Franja Horaria", observed=True)["Prob_Colapso"].mean().sort_values(ascending=False)
     franja_riesgo = franja_top.index[0]
     franja_valor = franja_top.iloc[0] * 100
     tendencias.append(
@@ -203,6 +211,10 @@ def generar_reporte_por_dia(df_original, dia):
             elements.append(Spacer(1, 20))
 
     # GUARDAR PDF
+    if not mostrar:
+     doc.build(elements)
+     return pdf_filename
+
     try:
      doc.build(elements)
      messagebox.showinfo("PDF generado", f"Reporte creado correctamente:\n{pdf_filename}")
@@ -214,12 +226,14 @@ def generar_reporte_por_dia(df_original, dia):
     except Exception as e:
      messagebox.showerror("Error al generar PDF", str(e))
 
+    return pdf_filename
+
 
 
 # ==========================================================
 # 🔹 INTERFAZ GRÁFICA TKINTER
 # ==========================================================
-def abrir_interfaz():
+def abrir_interfaz(df_global):
     ventana = tk.Tk()
     ventana.title("Generador de Reportes MIO")
     ventana.geometry("350x500")
@@ -238,19 +252,29 @@ def abrir_interfaz():
         ).pack(pady=5)
     ventana.mainloop()
 
+
+# ==========================================================
+# 📥 CARGA DE PREDICCIONES (solo al ejecutar el módulo)
+# ==========================================================
 archivo_excel = "predicciones_mio.xlsx"
 
-if not os.path.exists(archivo_excel):
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showerror("Error", "No se encontró predicciones_mio.xlsx")
-    root.destroy()
-    exit()
 
-df_global = pd.read_excel(archivo_excel)
-df_global["Fecha"] = pd.to_datetime(df_global["Fecha"], errors="coerce")
+@instrumentar()
+def cargar_predicciones(archivo=archivo_excel):
+    if not os.path.exists(archivo):
+        root = tk.Tk()
+        root.withdraw()
+        messagebox.showerror("Error", f"No se encontró {archivo}")
+        root.destroy()
+        return None
 
-if __name__ == "__main__":
-    abrir_interfaz()
-    
+    df_global = aplicar_esquema(pd.read_excel(archivo))
+    df_global["Fecha"] = pd.to_datetime(df_global["Fecha"], errors="coerce")
+    return df_global
 
+
+if __name__ == "__main__":
+    df_global = cargar_predicciones()
+    if df_global is None:
+        sys.exit(1)
+    abrir_interfaz(df_global)
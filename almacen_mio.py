@@ -0,0 +1,146 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from esquema_mio import aplicar_esquema
+
+
+# ALMACÉN COLUMNAR DE DATOS LIMPIOS (PARQUET PARTICIONADO POR MES)
+
+RUTA_DATOS_LIMPIOS = "data_limpia_mio"
+RUTA_DATOS_CRUDOS = "data_cruda_mio"
+RUTA_PREDICCIONES = "data_predicciones_mio"
+COLUMNA_PARTICION = "Mes"
+
+PARTICIONADO = ds.partitioning(
+    pa.schema([(COLUMNA_PARTICION, pa.int32())]),
+    flavor="hive"
+)
+
+
+def _mes(fecha):
+    """Clave de partición AAAAMM de una fecha"""
+    fecha = pd.Timestamp(fecha)
+    return fecha.year * 100 + fecha.month
+
+
+def existe_almacen(ruta=RUTA_DATOS_LIMPIOS):
+    return os.path.isdir(ruta) and any(
+        nombre.startswith(f"{COLUMNA_PARTICION}=") for nombre in os.listdir(ruta)
+    )
+
+
+def borrar_almacen(ruta=RUTA_DATOS_LIMPIOS):
+    if os.path.isdir(ruta):
+        shutil.rmtree(ruta)
+
+
+def siguiente_parte(ruta=RUTA_DATOS_LIMPIOS):
+    """Primer número de parte libre, para anexar datos sin pisar archivos existentes"""
+    partes = [-1]
+    if os.path.isdir(ruta):
+        for _, _, archivos in os.walk(ruta):
+            partes += [int(a.split("-")[1]) for a in archivos if a.startswith("parte-")]
+    return max(partes) + 1
+
+
+# ============================================================
+# 💾 ESCRITURA
+# ============================================================
+def guardar_particionado(df, ruta=RUTA_DATOS_LIMPIOS, parte=0):
+    """
+    Añade el DataFrame al almacén, particionado por mes y comprimido con zstd.
+    Cada llamada debe usar un número de parte distinto para no pisar archivos.
+    """
+    fechas = pd.to_datetime(df["Fecha"])
+    tabla = pa.Table.from_pandas(
+        df.assign(**{COLUMNA_PARTICION: (fechas.dt.year * 100 + fechas.dt.month).astype("int32")}),
+        preserve_index=False
+    )
+
+    ds.write_dataset(
+        tabla,
+        ruta,
+        format="parquet",
+        partitioning=PARTICIONADO,
+        basename_template=f"parte-{parte:05d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd")
+    )
+
+
+# ============================================================
+# 📥 LECTURA CON PROYECCIÓN Y FILTROS
+# ============================================================
+def _abrir(ruta):
+    if not existe_almacen(ruta):
+        raise FileNotFoundError(f"No se encontró el almacén de datos '{ruta}'.")
+    return ds.dataset(ruta, format="parquet", partitioning=PARTICIONADO)
+
+
+def _filtro(fecha_desde=None, fecha_hasta=None, terminales=None):
+    """Construye el filtro; la condición sobre el mes permite descartar particiones completas"""
+    filtro = None
+    condiciones = []
+
+    if fecha_desde is not None:
+        condiciones.append(ds.field(COLUMNA_PARTICION) >= _mes(fecha_desde))
+        condiciones.append(ds.field("Fecha") >= pa.scalar(pd.Timestamp(fecha_desde), pa.timestamp("ns")))
+
+    if fecha_hasta is not None:
+        condiciones.append(ds.field(COLUMNA_PARTICION) <= _mes(fecha_hasta))
+        condiciones.append(ds.field("Fecha") <= pa.scalar(pd.Timestamp(fecha_hasta), pa.timestamp("ns")))
+
+    if terminales is not None:
+        condiciones.append(ds.field("Terminal").isin(list(terminales)))
+
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+
+    return filtro
+
+
+def cargar_datos_limpios(ruta=RUTA_DATOS_LIMPIOS, columnas=None,
+                         fecha_desde=None, fecha_hasta=None, terminales=None, bajo_consumo=False):
+    """
+    Lee solo las columnas y el rango de fechas/terminales pedidos. Con bajo_consumo
+    la tabla de Arrow se libera columna a columna mientras se convierte a pandas,
+    en lugar de coexistir completa con el DataFrame.
+    """
+    dataset = _abrir(ruta)
+
+    if columnas is None:
+        columnas = [c for c in dataset.schema.names if c != COLUMNA_PARTICION]
+
+    tabla = dataset.to_table(
+        columns=list(columnas),
+        filter=_filtro(fecha_desde, fecha_hasta, terminales)
+    )
+    if not bajo_consumo:
+        return aplicar_esquema(tabla.to_pandas())
+
+    df = tabla.to_pandas(self_destruct=True, split_blocks=True)
+    del tabla
+    pa.default_memory_pool().release_unused()
+    return aplicar_esquema(df)
+
+
+def contar_filas(ruta=RUTA_DATOS_LIMPIOS, fecha_desde=None, fecha_hasta=None, terminales=None):
+    """Filas que devolvería cargar_datos_limpios con el mismo filtro, sin cargarlas en memoria"""
+    return _abrir(ruta).count_rows(filter=_filtro(fecha_desde, fecha_hasta, terminales))
+
+
+def fecha_maxima(ruta=RUTA_DATOS_LIMPIOS):
+    """Fecha más reciente del almacén leyendo solo la última partición"""
+    dataset = _abrir(ruta)
+    ultimo_mes = max(
+        ds.get_partition_keys(fragmento.partition_expression)[COLUMNA_PARTICION]
+        for fragmento in dataset.get_fragments()
+    )
+    fechas = dataset.to_table(
+        columns=["Fecha"],
+        filter=ds.field(COLUMNA_PARTICION) == ultimo_mes
+    )["Fecha"]
+    return pd.Timestamp(pc.max(fechas).as_py())
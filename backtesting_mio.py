@@ -0,0 +1,260 @@
+import argparse
+import copy
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# BACKTESTING CON ORIGEN MÓVIL (ROLLING-ORIGIN) SOBRE LA FECHA
+#
+#   python backtesting_mio.py --dias-prueba 7 --pliegues 52 --procesos 8
+#   python backtesting_mio.py --backend hist_gb --ventana 365 --archivo backtesting_mio.csv
+#
+# Cada pliegue entrena solo con días anteriores a su origen y evalúa los días
+# siguientes, así que nunca se usa información del futuro. Las features codificadas
+# se guardan una vez por versión de los datos (ordenadas por fecha) y cada proceso
+# las abre con mmap: un pliegue es un par de rebanadas contiguas, sin copias ni
+# envío de datos entre procesos.
+#
+# Los codificadores se ajustan con toda la historia: conocer de antemano los
+# nombres de terminales y franjas no adelanta ninguna medición.
+
+RUTA_CACHE_BACKTESTING = "backtesting_cache"
+ARCHIVO_BACKTESTING = "backtesting_mio.csv"
+
+
+# ============================================================
+# 🧮 FEATURES COMPARTIDAS (MMAP)
+# ============================================================
+def preparar_features(modelo, ruta=RUTA_CACHE_BACKTESTING):
+    """
+    Guarda (si no existen ya para estos datos) la matriz de features, los objetivos y
+    el día de cada fila, ordenados por fecha, en ruta/<huella>/. Devuelve esa carpeta.
+    """
+    from modelo_predictivo import COLUMNAS_MODELO, FORMATO_ARTEFACTOS
+
+    huella = hashlib.sha256(
+        pd.util.hash_pandas_object(modelo.df[COLUMNAS_MODELO], index=False).to_numpy().tobytes()
+    )
+    huella.update(str(FORMATO_ARTEFACTOS).encode("utf-8"))
+    carpeta = os.path.join(ruta, huella.hexdigest()[:16])
+
+    if os.path.exists(os.path.join(carpeta, "dias.npy")):
+        return carpeta
+
+    dias = modelo.df["Fecha"].to_numpy(dtype="datetime64[D]").astype(np.int32)
+    orden = np.argsort(dias, kind="stable")
+
+    # Codificadores propios en una copia superficial: el modelo recibido (quizá en
+    # uso) conserva los suyos
+    auxiliar = copy.copy(modelo)
+    auxiliar.label_encoders = {}
+    X = auxiliar._preparar_features(modelo.df, entrenar=True, orden=orden)
+    X[:, -1] = modelo.df["Ocupacion"].to_numpy()[orden]
+
+    os.makedirs(carpeta, exist_ok=True)
+    np.save(os.path.join(carpeta, "X.npy"), X)
+    np.save(os.path.join(carpeta, "ocupacion.npy"), modelo.df["Ocupacion"].to_numpy()[orden])
+    np.save(os.path.join(carpeta, "colapso.npy"), modelo.df["Colapsada"].to_numpy(dtype=np.int8)[orden])
+    # dias.npy se escribe al final: su presencia marca la caché como completa
+    np.save(os.path.join(carpeta, "dias.npy"), dias[orden])
+    return carpeta
+
+
+def cargar_features(carpeta):
+    """Arreglos guardados por preparar_features, abiertos con mmap (solo lectura)"""
+    return {
+        nombre: np.load(os.path.join(carpeta, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ("X", "ocupacion", "colapso", "dias")
+    }
+
+
+# ============================================================
+# 📅 PLIEGUES
+# ============================================================
+def generar_pliegues(dias, dias_prueba=7, paso=None, pliegues=None,
+                     dias_minimos_entrenamiento=30, ventana=None):
+    """
+    Orígenes cada `paso` días (por defecto, dias_prueba) desde el final hacia atrás.
+    Entrenamiento: todos los días anteriores al origen (o los últimos `ventana` días);
+    prueba: los dias_prueba días desde el origen. Con `pliegues` se toman los más recientes.
+    Devuelve rangos de filas sobre el arreglo de días ordenado.
+    """
+    paso = paso or dias_prueba
+    primero, ultimo = int(dias[0]), int(dias[-1])
+
+    origenes = []
+    origen = ultimo - dias_prueba + 1
+    while origen - primero >= dias_minimos_entrenamiento and (pliegues is None or len(origenes) < pliegues):
+        origenes.append(origen)
+        origen -= paso
+
+    resultado = []
+    for origen in reversed(origenes):
+        desde = primero if ventana is None else max(primero, origen - ventana)
+        a, b, c = np.searchsorted(dias, [desde, origen, origen + dias_prueba])
+        if c == b:
+            continue  # sin registros en los días de prueba
+        resultado.append({
+            "pliegue": len(resultado),
+            "origen": np.datetime64(origen, "D"),
+            "filas": (int(a), int(b), int(c)),
+        })
+    return resultado
+
+
+# ============================================================
+# 🧪 EVALUACIÓN DE UN PLIEGUE (EN UN PROCESO TRABAJADOR)
+# ============================================================
+def _evaluar_pliegue(carpeta, pliegue, backend, hiperparametros):
+    from sklearn.metrics import f1_score, mean_absolute_error, precision_score, r2_score, recall_score
+    from sklearn.preprocessing import StandardScaler
+    from modelo_predictivo import COLUMNAS_FEATURES, UMBRAL_COLAPSO, crear_estimador, limitar_hilos
+
+    inicio = time.perf_counter()
+    datos = cargar_features(carpeta)
+    a, b, c = pliegue["filas"]
+    n = len(COLUMNAS_FEATURES)
+
+    # Rebanadas del mmap: el entrenamiento no se copia; la prueba sí, porque su
+    # última columna se reemplaza por la ocupación predicha
+    X_train, X_test = datos["X"][a:b], np.array(datos["X"][b:c])
+    y_ocupacion, y_colapso = datos["ocupacion"], datos["colapso"]
+
+    def escalar(X_entrenamiento, X_prueba):
+        if backend == "hist_gb":
+            return X_entrenamiento, X_prueba
+        scaler = StandardScaler().fit(X_entrenamiento)
+        return scaler.transform(X_entrenamiento), scaler.transform(X_prueba)
+
+    registro = {
+        "pliegue": pliegue["pliegue"],
+        "origen": str(pliegue["origen"]),
+        "filas_entrenamiento": b - a,
+        "filas_prueba": c - b,
+        "pid": os.getpid(),
+    }
+
+    # Ocupación (un núcleo por trabajador: n_jobs=1 en los bosques, limitar_hilos(1) en hist_gb)
+    t = time.perf_counter()
+    X_o_train, X_o_test = escalar(X_train[:, :n], X_test[:, :n])
+    modelo_ocupacion = crear_estimador(backend, hiperparametros, "ocupacion", n_jobs=1)
+    with limitar_hilos(1):
+        modelo_ocupacion.fit(X_o_train, y_ocupacion[a:b])
+    registro["ajuste_ocupacion_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    with limitar_hilos(1):
+        ocupacion_pred = np.clip(modelo_ocupacion.predict(X_o_test), 0.1, 2.0)
+    registro["prediccion_ocupacion_s"] = time.perf_counter() - t
+    registro["r2_ocupacion"] = r2_score(y_ocupacion[b:c], ocupacion_pred)
+    registro["mae_ocupacion"] = mean_absolute_error(y_ocupacion[b:c], ocupacion_pred)
+
+    # Colapso: como en producción, evaluado con la ocupación predicha
+    registro.update({"ajuste_colapso_s": np.nan, "prediccion_colapso_s": np.nan,
+                     "f1_colapso": np.nan, "precision_colapso": np.nan, "recall_colapso": np.nan})
+    if len(np.unique(y_colapso[a:b])) == 2:
+        t = time.perf_counter()
+        X_test[:, -1] = ocupacion_pred
+        X_c_train, X_c_test = escalar(X_train, X_test)
+        modelo_colapso = crear_estimador(backend, hiperparametros, "colapso", n_jobs=1)
+        with limitar_hilos(1):
+            modelo_colapso.fit(X_c_train, y_colapso[a:b])
+        registro["ajuste_colapso_s"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        with limitar_hilos(1):
+            colapso_pred = modelo_colapso.predict_proba(X_c_test)[:, 1] > UMBRAL_COLAPSO
+        registro["prediccion_colapso_s"] = time.perf_counter() - t
+        y_real = y_colapso[b:c]
+        registro["f1_colapso"] = f1_score(y_real, colapso_pred, zero_division=0)
+        registro["precision_colapso"] = precision_score(y_real, colapso_pred, zero_division=0)
+        registro["recall_colapso"] = recall_score(y_real, colapso_pred, zero_division=0)
+
+    registro["total_s"] = time.perf_counter() - inicio
+    return registro
+
+
+# ============================================================
+# 🚀 BACKTEST COMPLETO
+# ============================================================
+def ejecutar_backtest(backend=None, hiperparametros=None, dias_prueba=7, paso=None, pliegues=None,
+                      dias_minimos_entrenamiento=30, ventana=None, procesos=None,
+                      modelo=None, archivo=None, ruta_cache=RUTA_CACHE_BACKTESTING):
+    """
+    Evalúa el modelo en pliegues de origen móvil repartidos entre procesos.
+    Devuelve un DataFrame con métricas y tiempos por pliegue (y lo guarda en CSV con archivo).
+    """
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    inicio = time.perf_counter()
+    if modelo is None:
+        modelo = ModeloPredictivoMIO_sklearn(backend=backend)
+    backend = modelo.backend
+    hiperparametros = hiperparametros or modelo.hiperparametros
+
+    carpeta = preparar_features(modelo, ruta_cache)
+    dias = cargar_features(carpeta)["dias"]
+    lista = generar_pliegues(dias, dias_prueba, paso, pliegues, dias_minimos_entrenamiento, ventana)
+    if not lista:
+        print("⚠️ No hay historia suficiente para ningún pliegue.")
+        return pd.DataFrame()
+
+    procesos = procesos or os.cpu_count() or 1
+    print(f"Backtesting: {len(lista)} pliegues de {dias_prueba} días, backend {backend}, {procesos} procesos...")
+
+    # Los pliegues más grandes (más historia) primero para equilibrar la carga
+    orden = sorted(lista, key=lambda p: p["filas"][2] - p["filas"][0], reverse=True)
+    if procesos < 2:
+        registros = [_evaluar_pliegue(carpeta, p, backend, hiperparametros) for p in orden]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            tareas = [ejecutor.submit(_evaluar_pliegue, carpeta, p, backend, hiperparametros) for p in orden]
+            registros = [tarea.result() for tarea in tareas]
+
+    resultados = pd.DataFrame(registros).sort_values("pliegue").reset_index(drop=True)
+    segundos = time.perf_counter() - inicio
+
+    print(f"{'pliegue':>8}{'origen':>12}{'entren.':>10}{'prueba':>9}{'R²':>8}{'MAE':>8}{'F1':>8}{'s':>8}")
+    for r in resultados.itertuples():
+        print(f"{r.pliegue:>8}{r.origen:>12}{r.filas_entrenamiento:>10}{r.filas_prueba:>9}"
+              f"{r.r2_ocupacion:>8.3f}{r.mae_ocupacion:>8.3f}{r.f1_colapso:>8.3f}{r.total_s:>8.2f}")
+    print(f"Promedio: R² = {resultados['r2_ocupacion'].mean():.3f}, "
+          f"MAE = {resultados['mae_ocupacion'].mean():.3f}, F1 = {resultados['f1_colapso'].mean():.3f} "
+          f"({segundos:.1f} s en total, {resultados['total_s'].sum():.1f} s de CPU en pliegues)")
+
+    if archivo:
+        resultados.to_csv(archivo, index=False)
+        print(f"Resultados por pliegue guardados en '{archivo}'")
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtesting con origen móvil de los modelos del MIO")
+    parser.add_argument("--backend", choices=["random_forest", "hist_gb", "lineal"], default=None)
+    parser.add_argument("--dias-prueba", type=int, default=7, help="Días evaluados por pliegue")
+    parser.add_argument("--paso", type=int, default=None, help="Días entre orígenes (por defecto, --dias-prueba)")
+    parser.add_argument("--pliegues", type=int, default=None, help="Solo los N pliegues más recientes")
+    parser.add_argument("--minimo", type=int, default=30, help="Días mínimos de entrenamiento")
+    parser.add_argument("--ventana", type=int, default=None,
+                        help="Entrenar solo con los últimos N días (por defecto, toda la historia)")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--archivo", default=ARCHIVO_BACKTESTING)
+    args = parser.parse_args(argv)
+
+    from pipeline_mio import asegurar_datos
+
+    asegurar_datos()
+    ejecutar_backtest(
+        backend=args.backend, dias_prueba=args.dias_prueba, paso=args.paso, pliegues=args.pliegues,
+        dias_minimos_entrenamiento=args.minimo, ventana=args.ventana, procesos=args.procesos,
+        archivo=args.archivo
+    )
+
+
+if __name__ == "__main__":
+    main()
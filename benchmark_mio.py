@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria
+    resource = None
+
+
+# BENCHMARKS DEL PIPELINE DE VISIONCALI
+#
+#   python benchmark_mio.py backends                   (sobre el almacén limpio actual)
+#   python benchmark_mio.py compacto                   (bosque de scikit-learn frente al compacto)
+#   python benchmark_mio.py suite --tamanos 100000 1000000 10000000 --base benchmark_base.json
+#
+# La suite corre cada etapa sobre datos sintéticos de tamaño creciente en una carpeta
+# temporal, guarda tiempo, pico de memoria (RSS) y filas/s en JSON y marca regresiones
+# respecto a una base anterior.
+
+ARCHIVO_BASE = "benchmark_base.json"
+TAMANOS_SUITE = [100_000, 1_000_000, 10_000_000]
+
+# Una etapa es regresión si tarda o consume más que la base en esta proporción
+TOLERANCIA_REGRESION = 0.20
+
+
+# ============================================================
+# ⚖️ COMPARACIÓN DE BACKENDS
+# ============================================================
+def comparar_backends(backends=("random_forest", "hist_gb"), dias_futuros=30, nucleos=1):
+    """
+    Entrena cada backend con los mismos datos y partición, y compara tiempo de ajuste,
+    latencia de predicción, tamaño del modelo serializado y precisión (R² y F1).
+    """
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    resultados = {}
+
+    for backend in backends:
+        modelo = ModeloPredictivoMIO_sklearn(backend=backend, nucleos=nucleos)
+
+        inicio = time.perf_counter()
+        modelo.entrenar_modelos(paralelo=False)
+        ajuste = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        df_pred = modelo.predecir(incluir_futuro=True, dias_futuros=dias_futuros, usar_cache=False)
+        prediccion = time.perf_counter() - inicio
+
+        tamano = len(pickle.dumps((modelo.modelo_ocupacion, modelo.modelo_colapso)))
+
+        resultados[backend] = {
+            "filas_entrenamiento": len(modelo.df),
+            "ajuste_s": ajuste,
+            "prediccion_s": prediccion,
+            "filas_por_s": len(df_pred) / prediccion,
+            "tamano_mb": tamano / 1e6,
+            "r2": modelo.metricas["r2_ocupacion"],
+            "f1": modelo.metricas["f1_colapso"],
+        }
+
+    print(f"\nComparación de backends ({dias_futuros} días de escenarios futuros):")
+    print(f"{'backend':<15}{'ajuste (s)':>12}{'predicción (s)':>16}{'filas/s':>12}{'MB':>10}{'R²':>8}{'F1':>8}")
+    for backend, r in resultados.items():
+        print(f"{backend:<15}{r['ajuste_s']:>12.2f}{r['prediccion_s']:>16.3f}{r['filas_por_s']:>12.0f}"
+              f"{r['tamano_mb']:>10.2f}{r['r2']:>8.3f}{r['f1']:>8.3f}")
+
+    return resultados
+
+
+# ============================================================
+# 🗜️ MODELO COMPACTO FRENTE A SCIKIT-LEARN
+# ============================================================
+def comparar_compacto(filas_escenarios=100_000, repeticiones=3):
+    """
+    Compara el bosque de scikit-learn (joblib) con su exportación compacta (npz):
+    tamaño en disco, tiempo de carga, latencia por filas_escenarios y diferencia máxima.
+    """
+    import joblib
+    import numpy as np
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    modelo = ModeloPredictivoMIO_sklearn(backend="random_forest", nucleos=1)
+    modelo.entrenar_modelos(paralelo=False)
+
+    with tempfile.TemporaryDirectory(prefix="compacto_mio_") as carpeta:
+        archivo_joblib = os.path.join(carpeta, "modelo.joblib")
+        archivo_npz = os.path.join(carpeta, "modelo.npz")
+        modelo.guardar_modelo(archivo_joblib)
+        modelo.exportar_compacto(archivo_npz)
+
+        resultados = {"joblib": {"tamano_mb": os.path.getsize(archivo_joblib) / 1e6},
+                      "compacto": {"tamano_mb": os.path.getsize(archivo_npz) / 1e6}}
+
+        inicio = time.perf_counter()
+        joblib.load(archivo_joblib)
+        resultados["joblib"]["carga_s"] = time.perf_counter() - inicio
+
+        compacto = ModeloPredictivoMIO_sklearn(backend="random_forest", nucleos=1)
+        inicio = time.perf_counter()
+        compacto.cargar_compacto(archivo_npz)
+        resultados["compacto"]["carga_s"] = time.perf_counter() - inicio
+
+    combinaciones = len(modelo.df["Terminal"].unique()) * len(modelo.df["Franja Horaria"].unique())
+    dias = max(1, filas_escenarios // combinaciones)
+
+    predicciones = {}
+    for nombre, m in (("joblib", modelo), ("compacto", compacto)):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            df_pred = m.predecir(dias_futuros=dias, usar_cache=False)
+            tiempos.append(time.perf_counter() - inicio)
+        predicciones[nombre] = df_pred
+        resultados[nombre]["prediccion_s"] = min(tiempos)
+        resultados[nombre]["filas"] = len(df_pred)
+
+    diferencia = max(
+        np.abs(predicciones["joblib"][col].to_numpy() - predicciones["compacto"][col].to_numpy()).max()
+        for col in ("Ocupacion", "Prob_Colapso")
+    )
+
+    print(f"\nModelo compacto frente a scikit-learn ({resultados['joblib']['filas']} escenarios):")
+    print(f"{'formato':<12}{'MB':>10}{'carga (s)':>12}{'predicción (s)':>16}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<12}{r['tamano_mb']:>10.2f}{r['carga_s']:>12.3f}{r['prediccion_s']:>16.3f}")
+    print(f"Diferencia máxima en las predicciones: {diferencia:.3g}")
+
+    resultados["diferencia_maxima"] = diferencia
+    return resultados
+
+
+# ============================================================
+# ⏱️ MEDICIÓN DE ETAPAS
+# ============================================================
+def _reiniciar_pico_rss():
+    """En Linux, escribir 5 en clear_refs reinicia el pico de RSS del proceso"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _pico_rss_mb():
+    """Pico de memoria residente: VmHWM si existe (se reinicia por etapa), si no ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if os.uname().sysname == "Darwin" else pico / 1024
+
+
+def _medir_etapa(resultados, nombre, funcion, filas=None):
+    """Ejecuta una etapa y anota segundos, pico de RSS y filas/s (filas=None: len del resultado)"""
+    _reiniciar_pico_rss()
+    inicio = time.perf_counter()
+    valor = funcion()
+    segundos = time.perf_counter() - inicio
+
+    filas = len(valor) if filas is None else filas
+    resultados[nombre] = {
+        "segundos": segundos,
+        "pico_rss_mb": _pico_rss_mb(),
+        "filas": filas,
+        "filas_por_s": filas / max(segundos, 1e-9),
+    }
+    print(f"  {nombre:<28}{segundos:>10.3f} s{resultados[nombre]['filas_por_s']:>14.0f} filas/s")
+    return valor
+
+
+def ejecutar_etapas(num_datos, dias_futuros=30, backend="random_forest", semilla=42):
+    """Corre cada etapa del pipeline sobre num_datos filas sintéticas (en el directorio actual)"""
+    import limpieza_mio
+    import mapaMIO
+    import Reportes_finales
+    from almacen_mio import borrar_almacen, guardar_particionado
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    resultados = {}
+    df_crudo = _medir_etapa(resultados, "generar_datos", lambda: limpieza_mio.generar_datos(num_datos, semilla))
+
+    df_limpio = _medir_etapa(
+        resultados, "limpiar_datos",
+        lambda: limpieza_mio.ObjetoDeDatos(df_crudo).limpiar_datos(), filas=num_datos
+    )
+    del df_crudo
+
+    borrar_almacen()
+    _medir_etapa(resultados, "guardar_almacen", lambda: guardar_particionado(df_limpio), filas=len(df_limpio))
+    del df_limpio
+
+    modelo = _medir_etapa(
+        resultados, "cargar_modelo_datos",
+        lambda: ModeloPredictivoMIO_sklearn(backend=backend, nucleos=None), filas=num_datos
+    )
+    _medir_etapa(resultados, "_preparar_features", lambda: modelo._preparar_features(modelo.df, entrenar=True))
+    _medir_etapa(resultados, "entrenar_modelo_ocupacion", modelo.entrenar_modelo_ocupacion, filas=len(modelo.df))
+    _medir_etapa(resultados, "entrenar_modelo_colapso", modelo.entrenar_modelo_colapso, filas=len(modelo.df))
+    _medir_etapa(resultados, "generar_fechas_futuras", lambda: modelo.generar_fechas_futuras(dias_futuros))
+    df_pred = _medir_etapa(
+        resultados, "predecir", lambda: modelo.predecir(dias_futuros=dias_futuros, usar_cache=False)
+    )
+    _medir_etapa(resultados, "guardar_predicciones", modelo.guardar_predicciones, filas=len(df_pred))
+
+    df_mapa = mapaMIO.agregar_coordenadas(mapaMIO.cargar_predicciones(), mapaMIO.ESTACIONES_MIO)
+    fecha = df_mapa["Fecha Predicha"].dt.date.min()
+    resumen = _medir_etapa(
+        resultados, "resumen_por_terminal",
+        lambda: mapaMIO.resumen_por_terminal(df_mapa, fecha), filas=len(df_mapa)
+    )
+    _medir_etapa(
+        resultados, "crear_mapa",
+        lambda: mapaMIO.crear_mapa(resumen, abrir_navegador=False), filas=len(resumen)
+    )
+
+    df_reporte = Reportes_finales.cargar_predicciones()
+    dia = df_reporte["Fecha"].dt.day.iloc[0]
+    _medir_etapa(
+        resultados, "generar_reporte_por_dia",
+        lambda: Reportes_finales.generar_reporte_por_dia(df_reporte, dia, mostrar=False),
+        filas=int((df_reporte["Fecha"].dt.day == dia).sum())
+    )
+
+    return resultados
+
+
+# ============================================================
+# 📏 SUITE Y COMPARACIÓN CON LA BASE
+# ============================================================
+def comparar_con_base(resultados, base, tolerancia=TOLERANCIA_REGRESION):
+    """Lista de regresiones (tamaño, etapa, métrica, base, actual) frente a una base anterior"""
+    regresiones = []
+    for tamano, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            anterior = base.get(tamano, {}).get(etapa)
+            if anterior is None:
+                continue
+            for metrica in ("segundos", "pico_rss_mb"):
+                if medida.get(metrica) is None or not anterior.get(metrica):
+                    continue
+                if medida[metrica] > anterior[metrica] * (1 + tolerancia):
+                    regresiones.append((tamano, etapa, metrica, anterior[metrica], medida[metrica]))
+    return regresiones
+
+
+def ejecutar_suite(tamanos=TAMANOS_SUITE, archivo_base=ARCHIVO_BASE, guardar=True,
+                   tolerancia=TOLERANCIA_REGRESION, **opciones):
+    """
+    Corre ejecutar_etapas para cada tamaño en una carpeta temporal, compara con la base
+    (si existe) y, con guardar, la reemplaza por los resultados nuevos.
+    """
+    archivo_base = os.path.abspath(archivo_base)
+    directorio_original = os.getcwd()
+    resultados = {}
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_mio_") as carpeta:
+        os.chdir(carpeta)
+        try:
+            for tamano in tamanos:
+                print(f"\n▶ {tamano} filas")
+                resultados[str(tamano)] = ejecutar_etapas(tamano, **opciones)
+        finally:
+            os.chdir(directorio_original)
+
+    regresiones = []
+    if os.path.exists(archivo_base):
+        with open(archivo_base, encoding="utf-8") as f:
+            base = json.load(f)["resultados"]
+        regresiones = comparar_con_base(resultados, base, tolerancia)
+
+        if regresiones:
+            print(f"\n⚠️ Regresiones (> {tolerancia:.0%} sobre la base):")
+            for tamano, etapa, metrica, anterior, actual in regresiones:
+                print(f"  {tamano:>10} {etapa:<28}{metrica:<13}{anterior:>10.3f} → {actual:.3f}")
+        else:
+            print("\nSin regresiones respecto a la base.")
+
+    if guardar:
+        with open(archivo_base, "w", encoding="utf-8") as f:
+            json.dump({"fecha": datetime.now().isoformat(timespec="seconds"), "resultados": resultados}, f, indent=2)
+        print(f"Base guardada en {archivo_base}")
+
+    return resultados, regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline predictivo del MIO")
+    modos = parser.add_subparsers(dest="modo", required=True)
+
+    modos.add_parser("backends", help="Comparar los backends sobre el almacén limpio actual")
+    modos.add_parser("compacto", help="Comparar el bosque de scikit-learn con su exportación compacta")
+
+    p_suite = modos.add_parser("suite", help="Medir cada etapa con datos sintéticos crecientes")
+    p_suite.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_SUITE)
+    p_suite.add_argument("--base", default=ARCHIVO_BASE)
+    p_suite.add_argument("--no-guardar", action="store_true", help="Solo comparar, sin reemplazar la base")
+    p_suite.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESION)
+    p_suite.add_argument("--dias", type=int, default=30)
+    p_suite.add_argument("--backend", choices=["random_forest", "hist_gb", "lineal"], default="random_forest")
+
+    args = parser.parse_args(argv)
+
+    if args.modo in ("backends", "compacto"):
+        from pipeline_mio import asegurar_datos
+
+        asegurar_datos()
+        comparar_backends() if args.modo == "backends" else comparar_compacto()
+    else:
+        _, regresiones = ejecutar_suite(
+            args.tamanos, args.base, guardar=not args.no_guardar, tolerancia=args.tolerancia,
+            dias_futuros=args.dias, backend=args.backend
+        )
+        return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
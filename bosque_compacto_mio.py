@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+
+# BOSQUES COMPACTOS PARA INFERENCIA RÁPIDA
+#
+# Un RandomForest entrenado se aplana en pocos arreglos contiguos (todos los árboles
+# seguidos): atributo (int8), umbral (float32), hijo izquierdo/derecho (int32) y el
+# valor de cada hoja. El evaluador recorre todos los árboles a la vez por lotes de
+# filas con numpy y da exactamente la misma salida que scikit-learn:
+#
+# - scikit-learn compara x (float32) <= umbral (float64); guardar el mayor float32
+#   que no supera el umbral (redondeo hacia abajo) conserva cada decisión.
+# - Las hojas apuntan a sí mismas con umbral +inf, así que recorrer max_depth pasos
+#   deja cada fila en su hoja sin máscaras.
+# - Las predicciones de los árboles se suman en el mismo orden que en scikit-learn.
+# - Las filas repetidas (muy comunes en la rejilla de escenarios) se evalúan una vez.
+
+
+class BosqueCompacto:
+
+    def __init__(self, atributo, umbral, izquierda, derecha, valores, raices, profundidad,
+                 media=None, escala=None, clasificador=False, clases=None):
+        self.atributo = atributo
+        self.umbral = umbral
+        self.izquierda = izquierda
+        self.derecha = derecha
+        self.valores = valores
+        self.raices = raices
+        self.profundidad = int(profundidad)
+        self.media = media
+        self.escala = escala
+        self.clasificador = bool(clasificador)
+        # Etiquetas de las columnas de predict_proba (classes_ de scikit-learn)
+        self.clases = clases
+
+    # ------------------------------
+    # COMPILACIÓN DESDE SCIKIT-LEARN
+    # ------------------------------
+    @classmethod
+    def desde_sklearn(cls, bosque, scaler=None, fusionar_hojas=True):
+        """Aplana un RandomForestRegressor/Classifier (y su StandardScaler, si lo hay)"""
+        if not hasattr(bosque, "estimators_"):
+            raise ValueError("Solo se pueden compactar bosques aleatorios entrenados.")
+
+        clasificador = hasattr(bosque, "classes_")
+        partes = {"atributo": [], "umbral": [], "izquierda": [], "derecha": [], "valores": []}
+        raices = []
+        desplazamiento = 0
+
+        for arbol in bosque.estimators_:
+            t = arbol.tree_
+            n = t.node_count
+            indices = np.arange(n)
+            hoja = t.children_left == -1
+
+            umbral = t.threshold.astype(np.float32)
+            # Redondeo hacia abajo: x32 <= umbral32  ⇔  x32 <= umbral64
+            mayores = umbral.astype(np.float64) > t.threshold
+            umbral[mayores] = np.nextafter(umbral[mayores], np.float32(-np.inf))
+            umbral[hoja] = np.inf
+
+            valores = t.value[:, 0, :].astype(np.float64)
+            if clasificador:
+                # Igual que DecisionTreeClassifier.predict_proba
+                normalizador = valores.sum(axis=1)
+                normalizador[normalizador == 0.0] = 1.0
+                valores = valores / normalizador[:, np.newaxis]
+            valores[~hoja] = 0.0
+
+            partes["atributo"].append(np.where(hoja, 0, t.feature).astype(np.int8))
+            partes["umbral"].append(umbral)
+            partes["izquierda"].append(np.where(hoja, indices, t.children_left).astype(np.int32) + desplazamiento)
+            partes["derecha"].append(np.where(hoja, indices, t.children_right).astype(np.int32) + desplazamiento)
+            partes["valores"].append(valores)
+            raices.append(desplazamiento)
+            desplazamiento += n
+
+        clases = None
+        if clasificador:
+            # Etiquetas de texto como str: el .npz se abre sin pickle
+            clases = np.asarray(bosque.classes_)
+            if clases.dtype == object:
+                clases = clases.astype(str)
+
+        bosque_compacto = cls(
+            **{nombre: np.concatenate(arreglos) for nombre, arreglos in partes.items()},
+            raices=np.array(raices, dtype=np.int32),
+            profundidad=max(arbol.tree_.max_depth for arbol in bosque.estimators_),
+            media=None if scaler is None else np.asarray(scaler.mean_, dtype=np.float64),
+            escala=None if scaler is None else np.asarray(scaler.scale_, dtype=np.float64),
+            clasificador=clasificador,
+            clases=clases
+        )
+        if fusionar_hojas:
+            bosque_compacto.fusionar_hojas()
+        return bosque_compacto
+
+    def fusionar_hojas(self):
+        """
+        Convierte en hoja todo nodo cuyos dos hijos son hojas con el mismo valor
+        (la salida no cambia) y elimina los nodos que quedan inalcanzables.
+        """
+        indices = np.arange(len(self.atributo), dtype=np.int32)
+        hoja = self.izquierda == indices
+
+        while True:
+            izq, der = self.izquierda, self.derecha
+            fusionables = (
+                ~hoja & hoja[izq] & hoja[der]
+                & np.all(self.valores[izq] == self.valores[der], axis=1)
+            )
+            if not fusionables.any():
+                break
+            self.valores[fusionables] = self.valores[izq[fusionables]]
+            self.izquierda[fusionables] = indices[fusionables]
+            self.derecha[fusionables] = indices[fusionables]
+            self.atributo[fusionables] = 0
+            self.umbral[fusionables] = np.inf
+            hoja |= fusionables
+
+        # Nodos alcanzables desde las raíces
+        alcanzable = np.zeros(len(indices), dtype=bool)
+        frontera = self.raices
+        while len(frontera):
+            alcanzable[frontera] = True
+            siguientes = np.concatenate([self.izquierda[frontera], self.derecha[frontera]])
+            frontera = np.unique(siguientes[~alcanzable[siguientes]])
+
+        nuevo_indice = (np.cumsum(alcanzable) - 1).astype(np.int32)
+        self.atributo = self.atributo[alcanzable]
+        self.umbral = self.umbral[alcanzable]
+        self.valores = self.valores[alcanzable]
+        self.izquierda = nuevo_indice[self.izquierda[alcanzable]]
+        self.derecha = nuevo_indice[self.derecha[alcanzable]]
+        self.raices = nuevo_indice[self.raices]
+        return self
+
+    # ------------------------------
+    # EVALUACIÓN POR LOTES
+    # ------------------------------
+    def _escalar(self, X):
+        """Mismas operaciones (y redondeos) que StandardScaler.transform: parámetros en float32"""
+        X = np.array(X, dtype=np.float32)
+        if self.media is not None:
+            X -= self.media.astype(np.float32)
+            X /= self.escala.astype(np.float32)
+        return X
+
+    def _evaluar(self, X, tamano_lote=8192):
+        """Promedio de las hojas alcanzadas en todos los árboles (filas ya escaladas)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_arboles = len(self.raices)
+        salida = np.empty((len(X), self.valores.shape[1]), dtype=np.float64)
+
+        for inicio in range(0, len(X), tamano_lote):
+            X_lote = X[inicio:inicio + tamano_lote]
+            filas = np.arange(len(X_lote))[:, np.newaxis]
+            nodos = np.repeat(self.raices[np.newaxis, :], len(X_lote), axis=0)
+
+            for _ in range(self.profundidad):
+                va_izquierda = X_lote[filas, self.atributo[nodos]] <= self.umbral[nodos]
+                nodos = np.where(va_izquierda, self.izquierda[nodos], self.derecha[nodos])
+
+            # Suma árbol por árbol, en el mismo orden que scikit-learn
+            acumulado = np.zeros((len(X_lote), self.valores.shape[1]), dtype=np.float64)
+            for j in range(n_arboles):
+                acumulado += self.valores[nodos[:, j]]
+            acumulado /= n_arboles
+            salida[inicio:inicio + tamano_lote] = acumulado
+
+        return salida
+
+    def _predecir_valores(self, X):
+        X = np.ascontiguousarray(self._escalar(X))
+        # Filas idénticas por sus bytes (factorize es mucho más rápido que np.unique(axis=0))
+        codigos, unicas = pd.factorize(X.view(f"S{X.shape[1] * X.itemsize}").ravel())
+        primera = np.empty(len(unicas), dtype=np.int64)
+        primera[codigos[::-1]] = np.arange(len(X))[::-1]
+        return self._evaluar(X[primera])[codigos]
+
+    def predict(self, X):
+        valores = self._predecir_valores(X)
+        if not self.clasificador:
+            return valores[:, 0]
+        columna = valores.argmax(axis=1)
+        # Sin clases guardadas (archivos anteriores) las etiquetas eran 0..n-1
+        return columna if self.clases is None else self.clases[columna]
+
+    def predict_proba(self, X):
+        if not self.clasificador:
+            raise ValueError("predict_proba solo está disponible para clasificadores.")
+        return self._predecir_valores(X)
+
+    # ------------------------------
+    # PERSISTENCIA
+    # ------------------------------
+    def a_arreglos(self, prefijo):
+        arreglos = {
+            "atributo": self.atributo, "umbral": self.umbral, "izquierda": self.izquierda,
+            "derecha": self.derecha, "valores": self.valores, "raices": self.raices,
+            "profundidad": np.array(self.profundidad), "clasificador": np.array(self.clasificador),
+        }
+        if self.media is not None:
+            arreglos["media"] = self.media
+            arreglos["escala"] = self.escala
+        if self.clases is not None:
+            arreglos["clases"] = self.clases
+        return {f"{prefijo}_{nombre}": valor for nombre, valor in arreglos.items()}
+
+    @classmethod
+    def desde_arreglos(cls, datos, prefijo):
+        def leer(nombre):
+            clave = f"{prefijo}_{nombre}"
+            return datos[clave] if clave in datos else None
+
+        return cls(
+            atributo=leer("atributo"), umbral=leer("umbral"), izquierda=leer("izquierda"),
+            derecha=leer("derecha"), valores=leer("valores"), raices=leer("raices"),
+            profundidad=leer("profundidad"), media=leer("media"), escala=leer("escala"),
+            clasificador=leer("clasificador"), clases=leer("clases")
+        )
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.atributo, self.umbral, self.izquierda,
+                                      self.derecha, self.valores, self.raices))
@@ -0,0 +1,334 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# BÚSQUEDA DE HIPERPARÁMETROS CON REDUCCIÓN SUCESIVA (SUCCESSIVE HALVING)
+#
+#   python busqueda_mio.py --candidatos 24 --procesos 8
+#   python busqueda_mio.py --backend hist_gb --tolerancia 0.01 --no-guardar
+#
+# Todos los candidatos se evalúan primero con una submuestra pequeña del
+# entrenamiento; en cada ronda sigue solo el mejor 1/eta y la submuestra crece
+# eta veces, hasta usar todo el entrenamiento con los finalistas. La validación
+# son los últimos días (la fracción fraccion_validacion de las filas, en días
+# completos, o los últimos dias_validacion); nunca se entrena con fechas posteriores.
+#
+# Como en producción, los candidatos de colapso se validan con la ocupación que
+# predice el modelo de ocupación elegido, no con la real (de la que sale la etiqueta).
+#
+# De los finalistas se informa la frontera costo/precisión (tiempo de ajuste y
+# tamaño frente a R² o F1) y se elige el más barato cuya precisión queda a menos
+# de `tolerancia` de la mejor. La elección se guarda en config_modelo.json, que
+# ModeloPredictivoMIO_sklearn lee al crearse.
+
+ESPACIOS_BUSQUEDA = {
+    "random_forest": {
+        "n_estimators": [25, 50, 100, 200],
+        "max_depth": [8, 12, 16, 20, None],
+        "min_samples_split": [2, 5, 10, 20],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.75, 0.5],
+    },
+    "hist_gb": {
+        "max_iter": [50, 100, 200, 400],
+        "learning_rate": [0.05, 0.1, 0.2],
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [10, 20, 50, 100],
+    },
+}
+
+# Métrica que se maximiza en cada tarea
+METRICAS = {"ocupacion": "r2", "colapso": "f1"}
+
+
+def _candidatos(backend, tarea, base, cantidad, semilla):
+    """La configuración actual más cantidad - 1 combinaciones distintas al azar del espacio"""
+    from modelo_predictivo import crear_estimador
+
+    espacio = ESPACIOS_BUSQUEDA[backend]
+    combinaciones = [dict(zip(espacio, valores)) for valores in itertools.product(*espacio.values())]
+    rng = np.random.default_rng(semilla)
+    elegidas = rng.permutation(len(combinaciones))[:max(0, cantidad - 1)]
+
+    # Valores actuales de cada parámetro buscado (los no fijados, con el valor por defecto del estimador)
+    parametros = crear_estimador(backend, {tarea: base}, tarea).get_params()
+    actual = {clave: parametros[clave] for clave in espacio}
+    candidatos = [actual] + [combinaciones[i] for i in elegidas if combinaciones[i] != actual]
+    return candidatos[:cantidad]
+
+
+# ============================================================
+# 🧪 EVALUACIÓN DE UN CANDIDATO (EN UN PROCESO TRABAJADOR)
+# ============================================================
+def _evaluar_candidato(carpeta, backend, tarea, fijos, parametros, corte, filas, semilla,
+                       ocupacion_validacion=None):
+    """
+    Ajusta un candidato y lo puntúa en la validación. Los de colapso necesitan
+    ocupacion_validacion: la ocupación predicha que reemplaza a la real en X_val.
+    """
+    from sklearn.metrics import f1_score, r2_score
+    from sklearn.preprocessing import StandardScaler
+    from backtesting_mio import cargar_features
+    from modelo_predictivo import COLUMNAS_FEATURES, UMBRAL_COLAPSO, crear_estimador, limitar_hilos
+
+    datos = cargar_features(carpeta)
+    columnas = len(COLUMNAS_FEATURES) if tarea == "ocupacion" else datos["X"].shape[1]
+    objetivo = datos["ocupacion"] if tarea == "ocupacion" else datos["colapso"]
+
+    # Submuestra reproducible del entrenamiento (todo, en la última ronda)
+    if filas < corte:
+        indices = np.sort(np.random.default_rng(semilla).choice(corte, filas, replace=False))
+        X_train, y_train = datos["X"][indices, :columnas], objetivo[indices]
+    else:
+        X_train, y_train = datos["X"][:corte, :columnas], objetivo[:corte]
+    X_val, y_val = datos["X"][corte:, :columnas], objetivo[corte:]
+    if tarea == "colapso":
+        if ocupacion_validacion is None:
+            raise ValueError("Los candidatos de colapso se validan con la ocupación predicha.")
+        # Copia: la última columna del mmap es la ocupación real
+        X_val = np.array(X_val)
+        X_val[:, -1] = ocupacion_validacion
+
+    if backend != "hist_gb":
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_val = scaler.transform(X_train), scaler.transform(X_val)
+
+    estimador = crear_estimador(backend, {tarea: dict(fijos, **parametros)}, tarea, n_jobs=1)
+
+    # Un núcleo por trabajador también con hist_gb, que ignora n_jobs
+    with limitar_hilos(1):
+        inicio = time.perf_counter()
+        estimador.fit(X_train, y_train)
+        ajuste = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        if tarea == "ocupacion":
+            prediccion = estimador.predict(X_val)
+        else:
+            # La misma regla de decisión que Estado_Previsto en producción
+            prediccion = estimador.predict_proba(X_val)[:, 1] > UMBRAL_COLAPSO
+        prediccion_s = time.perf_counter() - inicio
+
+    puntaje = r2_score(y_val, prediccion) if tarea == "ocupacion" else f1_score(y_val, prediccion, zero_division=0)
+    return {
+        "filas": int(len(X_train)),
+        METRICAS[tarea]: float(puntaje),
+        "ajuste_s": ajuste,
+        "prediccion_s": prediccion_s,
+        "tamano_mb": len(pickle.dumps(estimador)) / 1e6,
+    }
+
+
+def _predecir_ocupacion_validacion(carpeta, backend, parametros, corte):
+    """Ocupación de la validación según el modelo de ocupación elegido, ajustado con todo el entrenamiento"""
+    from sklearn.preprocessing import StandardScaler
+    from backtesting_mio import cargar_features
+    from modelo_predictivo import COLUMNAS_FEATURES, crear_estimador, limitar_hilos
+
+    datos = cargar_features(carpeta)
+    n = len(COLUMNAS_FEATURES)
+    X_train, X_val = datos["X"][:corte, :n], datos["X"][corte:, :n]
+    if backend != "hist_gb":
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_val = scaler.transform(X_train), scaler.transform(X_val)
+
+    estimador = crear_estimador(backend, {"ocupacion": parametros}, "ocupacion", n_jobs=1)
+    with limitar_hilos(1):
+        estimador.fit(X_train, datos["ocupacion"][:corte])
+        return np.clip(estimador.predict(X_val), 0.1, 2.0)
+
+
+# ============================================================
+# 📉 FRONTERA COSTO / PRECISIÓN
+# ============================================================
+def frontera_pareto(resultados, metrica):
+    """Resultados no dominados: ninguno es a la vez más preciso, más rápido y más pequeño"""
+    def domina(a, b):
+        mejor_o_igual = (a[metrica] >= b[metrica] and a["ajuste_s"] <= b["ajuste_s"]
+                         and a["tamano_mb"] <= b["tamano_mb"])
+        estricto = (a[metrica] > b[metrica] or a["ajuste_s"] < b["ajuste_s"]
+                    or a["tamano_mb"] < b["tamano_mb"])
+        return mejor_o_igual and estricto
+
+    frontera = [r for r in resultados if not any(domina(otro, r) for otro in resultados)]
+    return sorted(frontera, key=lambda r: r["ajuste_s"])
+
+
+def _elegir(finalistas, metrica, tolerancia):
+    """El finalista más rápido de ajustar entre los que quedan a `tolerancia` del mejor"""
+    mejor = max(r[metrica] for r in finalistas)
+    aceptables = [r for r in finalistas if r[metrica] >= mejor - tolerancia]
+    return min(aceptables, key=lambda r: (r["ajuste_s"], r["tamano_mb"]))
+
+
+# ============================================================
+# ✂️ REDUCCIÓN SUCESIVA
+# ============================================================
+def reduccion_sucesiva(carpeta, backend, tarea, fijos, candidatos, corte,
+                       eta=3, finalistas=4, filas_minimas=5_000, procesos=1, semilla=42,
+                       ocupacion_validacion=None):
+    """
+    Evalúa los candidatos por rondas. Devuelve el historial completo y los
+    resultados de la última ronda (los finalistas con todo el entrenamiento).
+    """
+    metrica = METRICAS[tarea]
+    rondas = max(1, math.ceil(math.log(max(len(candidatos) / finalistas, 1), eta)) + 1)
+    vivos = list(range(len(candidatos)))
+    historial = []
+    ejecutor = ProcessPoolExecutor(max_workers=procesos) if procesos > 1 else None
+
+    try:
+        for ronda in range(rondas):
+            ultima = ronda == rondas - 1
+            filas = corte if ultima else min(corte, filas_minimas * eta ** ronda)
+
+            argumentos = [(carpeta, backend, tarea, fijos, candidatos[i], corte, filas, semilla,
+                           ocupacion_validacion) for i in vivos]
+            if ejecutor is None:
+                evaluaciones = [_evaluar_candidato(*a) for a in argumentos]
+            else:
+                tareas = [ejecutor.submit(_evaluar_candidato, *a) for a in argumentos]
+                evaluaciones = [t.result() for t in tareas]
+
+            ronda_resultados = [
+                dict(evaluacion, candidato=i, ronda=ronda, parametros=candidatos[i])
+                for i, evaluacion in zip(vivos, evaluaciones)
+            ]
+            historial += ronda_resultados
+
+            mejores = sorted(ronda_resultados, key=lambda r: r[metrica], reverse=True)
+            print(f"  {tarea} · ronda {ronda} ({filas} filas, {len(vivos)} candidatos): "
+                  f"mejor {metrica} = {mejores[0][metrica]:.4f}")
+
+            if ultima:
+                return historial, ronda_resultados
+            vivos = [r["candidato"] for r in mejores[:max(finalistas, math.ceil(len(vivos) / eta))]]
+    finally:
+        if ejecutor is not None:
+            ejecutor.shutdown()
+
+
+# ============================================================
+# 🚀 BÚSQUEDA COMPLETA
+# ============================================================
+def buscar_hiperparametros(backend="random_forest", candidatos=24, eta=3, finalistas=4,
+                           fraccion_validacion=0.2, dias_validacion=None, filas_minimas=5_000,
+                           tolerancia=0.01, procesos=None, semilla=42, guardar=True,
+                           archivo_config=None, modelo=None):
+    """
+    Busca primero los hiperparámetros de ocupación (R²) y después los de colapso (F1),
+    validados con la ocupación que predice el modelo de ocupación elegido.
+    Con guardar, escribe la configuración elegida en archivo_config.
+    """
+    from backtesting_mio import cargar_features, preparar_features
+    from modelo_predictivo import ARCHIVO_CONFIG_MODELO, ModeloPredictivoMIO_sklearn
+
+    if backend not in ESPACIOS_BUSQUEDA:
+        raise ValueError(f"No hay espacio de búsqueda para '{backend}'. "
+                         f"Opciones: {', '.join(ESPACIOS_BUSQUEDA)}")
+
+    archivo_config = archivo_config or ARCHIVO_CONFIG_MODELO
+    inicio = time.perf_counter()
+
+    # Punto de partida: los hiperparámetros por defecto, sin la configuración guardada
+    if modelo is None:
+        modelo = ModeloPredictivoMIO_sklearn(backend=backend, archivo_config=None)
+    carpeta = preparar_features(modelo)
+    dias = cargar_features(carpeta)["dias"]
+    if dias_validacion is not None:
+        corte = int(np.searchsorted(dias, dias[-1] - dias_validacion + 1))
+    else:
+        # La fracción pedida de las filas, empezando en un día completo
+        corte = int(np.searchsorted(dias, dias[int(len(dias) * (1 - fraccion_validacion))]))
+    procesos = procesos or os.cpu_count() or 1
+
+    print(f"Búsqueda de hiperparámetros ({backend}): {candidatos} candidatos, eta = {eta}, "
+          f"{corte} filas de entrenamiento, {len(dias) - corte} de validación, {procesos} procesos")
+
+    config = {"backend": backend}
+    informe = {"backend": backend, "tareas": {}}
+    ocupacion_validacion = None
+    for tarea, metrica in METRICAS.items():
+        base = modelo.hiperparametros[tarea]
+        lista = _candidatos(backend, tarea, base, candidatos, semilla)
+        # Lo que no se busca (semilla, class_weight...) se mantiene
+        fijos = {clave: valor for clave, valor in base.items() if clave not in ESPACIOS_BUSQUEDA[backend]}
+
+        historial, ultimos = reduccion_sucesiva(
+            carpeta, backend, tarea, fijos, lista, corte,
+            eta=eta, finalistas=finalistas, filas_minimas=filas_minimas, procesos=procesos, semilla=semilla,
+            ocupacion_validacion=ocupacion_validacion
+        )
+        frontera = frontera_pareto(ultimos, metrica)
+        elegido = _elegir(ultimos, metrica, tolerancia)
+        actual = next((r for r in ultimos if r["candidato"] == 0), None)
+
+        print(f"\nFrontera costo/precisión de {tarea}:")
+        print(f"{'ajuste (s)':>12}{'MB':>10}{metrica:>10}  parámetros")
+        for r in frontera:
+            marca = " ← elegido" if r is elegido else ""
+            print(f"{r['ajuste_s']:>12.2f}{r['tamano_mb']:>10.2f}{r[metrica]:>10.4f}  {r['parametros']}{marca}")
+        if actual is not None:
+            print(f"Configuración actual: {actual['ajuste_s']:.2f} s, {actual['tamano_mb']:.2f} MB, "
+                  f"{metrica} = {actual[metrica]:.4f}")
+        else:
+            print("La configuración actual no llegó a la ronda final.")
+
+        config[tarea] = elegido["parametros"]
+        if tarea == "ocupacion":
+            ocupacion_validacion = _predecir_ocupacion_validacion(
+                carpeta, backend, dict(fijos, **elegido["parametros"]), corte
+            )
+        informe["tareas"][tarea] = {
+            "elegido": elegido, "actual": actual, "frontera": frontera, "historial": historial
+        }
+
+    informe["segundos"] = time.perf_counter() - inicio
+    print(f"\nBúsqueda completada en {informe['segundos']:.1f} s")
+
+    if guardar:
+        with open(archivo_config, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        print(f"Configuración guardada en '{archivo_config}' (se usará en el próximo entrenamiento)")
+    informe["config"] = config
+    return informe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros con reducción sucesiva")
+    parser.add_argument("--backend", choices=list(ESPACIOS_BUSQUEDA), default="random_forest")
+    parser.add_argument("--candidatos", type=int, default=24)
+    parser.add_argument("--eta", type=int, default=3, help="Factor de reducción por ronda")
+    parser.add_argument("--finalistas", type=int, default=4)
+    parser.add_argument("--fraccion-validacion", type=float, default=0.2,
+                        help="Fracción final de las filas (en días completos) usada para validar")
+    parser.add_argument("--dias-validacion", type=int, default=None,
+                        help="Validar con los últimos N días (en lugar de la fracción)")
+    parser.add_argument("--filas-minimas", type=int, default=5_000, help="Submuestra de la primera ronda")
+    parser.add_argument("--tolerancia", type=float, default=0.01,
+                        help="Pérdida de R²/F1 aceptada a cambio de un modelo más barato")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--no-guardar", action="store_true", help="No escribir config_modelo.json")
+    args = parser.parse_args(argv)
+
+    from pipeline_mio import asegurar_datos
+
+    asegurar_datos()
+    buscar_hiperparametros(
+        backend=args.backend, candidatos=args.candidatos, eta=args.eta, finalistas=args.finalistas,
+        fraccion_validacion=args.fraccion_validacion, dias_validacion=args.dias_validacion,
+        filas_minimas=args.filas_minimas,
+        tolerancia=args.tolerancia, procesos=args.procesos, guardar=not args.no_guardar
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+
+# CACHÉ PERSISTENTE DE PREDICCIONES (SQLITE)
+#
+# La salida de los modelos depende solo de las features codificadas del escenario
+# (capacidad, terminal, franja, día de la semana) y del modelo que predice. Cada
+# resultado se guarda con esa clave más la versión del modelo, así que:
+#
+# - un modelo nuevo (otros datos o hiperparámetros) nunca lee resultados de otro;
+# - los escenarios repetidos (mismo día de la semana, otra fecha) se predicen una vez;
+# - al repetir el pronóstico de los próximos días solo se predice lo que falta.
+#
+# El tamaño está acotado: al pasar de max_entradas se borran las menos usadas (LRU).
+
+ARCHIVO_CACHE_PREDICCIONES = "predicciones_cache_mio.sqlite"
+MAX_ENTRADAS_CACHE = 1_000_000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS predicciones (
+    version      TEXT    NOT NULL,
+    capacidad    REAL    NOT NULL,
+    terminal     INTEGER NOT NULL,
+    franja       INTEGER NOT NULL,
+    dia          INTEGER NOT NULL,
+    ocupacion    REAL    NOT NULL,
+    prob_colapso REAL    NOT NULL,
+    ultimo_uso   INTEGER NOT NULL,
+    UNIQUE (version, capacidad, terminal, franja, dia)
+);
+CREATE INDEX IF NOT EXISTS predicciones_uso ON predicciones (ultimo_uso);
+"""
+
+
+class CachePredicciones:
+
+    def __init__(self, archivo=ARCHIVO_CACHE_PREDICCIONES, max_entradas=MAX_ENTRADAS_CACHE):
+        self.archivo = archivo
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._candado = threading.Lock()
+
+        carpeta = os.path.dirname(self.archivo)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conexion(self):
+        """Una conexión por operación (usable desde varios hilos y procesos); confirma al salir"""
+        conexion = sqlite3.connect(self.archivo, timeout=30)
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    # ------------------------------
+    # CONSULTA
+    # ------------------------------
+    def predecir(self, X, version, predecir_faltantes):
+        """
+        Ocupación y probabilidad de colapso para cada fila de X (features codificadas,
+        float32). Las filas distintas que no están en la caché se pasan juntas a
+        predecir_faltantes(X_faltantes) -> (ocupacion, prob_colapso) y se guardan.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        codigos, unicas = pd.factorize(X.view(f"S{X.shape[1] * X.itemsize}").ravel())
+        primera = np.empty(len(unicas), dtype=np.int64)
+        primera[codigos[::-1]] = np.arange(len(X))[::-1]
+        claves = X[primera]
+
+        ocupacion = np.full(len(claves), np.nan)
+        prob_colapso = np.full(len(claves), np.nan)
+        filas_clave = [
+            (i, float(c), int(t), int(f), int(d)) for i, (c, t, f, d) in enumerate(claves.tolist())
+        ]
+
+        with self._candado, self._conexion() as conexion:
+            conexion.execute(
+                "CREATE TEMP TABLE consulta "
+                "(i INTEGER PRIMARY KEY, capacidad REAL, terminal INTEGER, franja INTEGER, dia INTEGER)"
+            )
+            conexion.executemany("INSERT INTO consulta VALUES (?, ?, ?, ?, ?)", filas_clave)
+
+            # Búsqueda por el índice único (version, capacidad, terminal, franja, dia)
+            encontradas = conexion.execute(
+                "SELECT c.i, p.rowid, p.ocupacion, p.prob_colapso FROM consulta c "
+                "JOIN predicciones p ON p.version = ? AND p.capacidad = c.capacidad "
+                "AND p.terminal = c.terminal AND p.franja = c.franja AND p.dia = c.dia",
+                (version,)
+            ).fetchall()
+
+            ahora = time.time_ns()
+            if encontradas:
+                indices, filas, ocupaciones, probabilidades = zip(*encontradas)
+                ocupacion[list(indices)] = ocupaciones
+                prob_colapso[list(indices)] = probabilidades
+                conexion.executemany(
+                    "UPDATE predicciones SET ultimo_uso = ? WHERE rowid = ?",
+                    [(ahora, fila) for fila in filas]
+                )
+
+            faltantes = np.flatnonzero(np.isnan(ocupacion))
+            if len(faltantes):
+                ocupacion[faltantes], prob_colapso[faltantes] = predecir_faltantes(claves[faltantes])
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO predicciones VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(version, *filas_clave[i][1:], float(ocupacion[i]), float(prob_colapso[i]), ahora)
+                     for i in faltantes]
+                )
+                self._desalojar(conexion)
+
+        self.aciertos += len(encontradas)
+        self.fallos += len(faltantes)
+        return ocupacion[codigos], prob_colapso[codigos]
+
+    def _desalojar(self, conexion):
+        """Borra las entradas menos usadas recientemente por encima de max_entradas"""
+        exceso = conexion.execute("SELECT COUNT(*) FROM predicciones").fetchone()[0] - self.max_entradas
+        if exceso > 0:
+            conexion.execute(
+                "DELETE FROM predicciones WHERE rowid IN "
+                "(SELECT rowid FROM predicciones ORDER BY ultimo_uso LIMIT ?)",
+                (exceso,)
+            )
+
+    # ------------------------------
+    # MANTENIMIENTO
+    # ------------------------------
+    def entradas(self, version=None):
+        with self._conexion() as conexion:
+            if version is None:
+                return conexion.execute("SELECT COUNT(*) FROM predicciones").fetchone()[0]
+            return conexion.execute(
+                "SELECT COUNT(*) FROM predicciones WHERE version = ?", (version,)
+            ).fetchone()[0]
+
+    def vaciar(self):
+        with self._candado, self._conexion() as conexion:
+            conexion.execute("DELETE FROM predicciones")
@@ -0,0 +1,116 @@
+import time
+import numpy as np
+import pandas as pd
+
+
+# ESQUEMA COMPARTIDO: COLUMNAS CATEGÓRICAS (CÓDIGOS ENTEROS EN VEZ DE TEXTO)
+
+TERMINALES = [
+    "Terminal Paso del Comercio", "Terminal Menga", "Terminal Andrés Sanín",
+    "Terminal Simón Bolívar", "Terminal Aguablanca", "Centro", "Plaza de Caycedo",
+    "Santa Rosa", "Universidades", "Univalle", "Manzana del Saber", "Meléndez",
+    "Estadio", "Unidad Deportiva", "Versalles", "Las Américas", "Torre de Cali",
+    "Flora Industrial", "Chiminangos", "San Bosco", "Salomia", "Popular", "Manzanares",
+    "Fátima", "Piloto", "San Nicolás", "Río Cali", "Plaza de Toros", "Refugio",
+    "Capri", "Álamos", "Vipasa", "Prados del Norte", "Calipso", "Villa del Lago",
+    "Lleras Restrepo", "Ciudad Modelo", "Villa del Sur", "Mariano Ramos", "Cañaverales"
+]
+
+FRANJAS = [
+    "05:30-09:00", "09:00-12:00", "12:00-15:00",
+    "15:00-18:00", "18:00-21:00", "21:00-23:00"
+]
+FRANJA_DESCONOCIDA = "Desconocida"
+
+# Mismo orden que Timestamp.dayofweek (lunes = 0)
+DIAS_SEMANA = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+ESTADOS = ["Estable", "Colapsada"]
+ESTADOS_PREVISTOS = ["Estable", "Colapsará"]
+
+# Terminales y franjas en orden alfabético: los códigos coinciden con el orden
+# de LabelEncoder y ordenar por código equivale a ordenar por nombre
+TIPO_TERMINAL = pd.CategoricalDtype(sorted(TERMINALES))
+TIPO_FRANJA = pd.CategoricalDtype(sorted(FRANJAS + [FRANJA_DESCONOCIDA]))
+TIPO_DIA = pd.CategoricalDtype(DIAS_SEMANA)
+TIPO_ESTADO = pd.CategoricalDtype(ESTADOS)
+TIPO_ESTADO_PREVISTO = pd.CategoricalDtype(ESTADOS_PREVISTOS)
+
+ESQUEMA = {
+    "Terminal": TIPO_TERMINAL,
+    "Franja Horaria": TIPO_FRANJA,
+    "Día de la Semana": TIPO_DIA,
+    "Estado": TIPO_ESTADO,
+    "Estado_Previsto": TIPO_ESTADO_PREVISTO,
+    "Estado Futuro": TIPO_ESTADO_PREVISTO,
+}
+
+
+def _tipo_con_extras(serie, tipo):
+    """Tipo categórico del esquema ampliado con valores no previstos (p. ej. estaciones nuevas)"""
+    valores = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else pd.unique(serie.dropna())
+    extras = set(valores) - set(tipo.categories)
+    if not extras:
+        return tipo
+    return pd.CategoricalDtype(list(tipo.categories) + sorted(extras))
+
+
+def aplicar_esquema(df):
+    """Convierte (en el mismo DataFrame) las columnas conocidas a su tipo categórico"""
+    for col, tipo in ESQUEMA.items():
+        if col in df.columns and df[col].dtype != tipo:
+            df[col] = df[col].astype(_tipo_con_extras(df[col], tipo))
+    return df
+
+
+def dias_semana(fechas):
+    """Día de la semana categórico calculado con aritmética entera sobre las fechas"""
+    fechas = pd.DatetimeIndex(fechas)
+    return pd.Categorical.from_codes(fechas.dayofweek, dtype=TIPO_DIA)
+
+
+# ============================================================
+# 📊 REPORTE DE MEMORIA Y VELOCIDAD
+# ============================================================
+def _medir(funcion, repeticiones=3):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def reporte_esquema(num_filas=1_000_000, semilla=42):
+    """Compara memoria por fila, filtros y groupby entre columnas de texto y categóricas"""
+    rng = np.random.default_rng(semilla)
+
+    df_cat = pd.DataFrame({
+        "Terminal": pd.Categorical.from_codes(rng.integers(0, len(TERMINALES), num_filas), dtype=TIPO_TERMINAL),
+        "Franja Horaria": pd.Categorical.from_codes(rng.integers(0, len(FRANJAS), num_filas), dtype=TIPO_FRANJA),
+        "Día de la Semana": pd.Categorical.from_codes(rng.integers(0, 7, num_filas), dtype=TIPO_DIA),
+        "Estado": pd.Categorical.from_codes(rng.integers(0, 2, num_filas), dtype=TIPO_ESTADO),
+        "Personas Actuales": rng.integers(30, 320, num_filas).astype(float),
+    })
+    df_txt = df_cat.astype({col: object for col in ["Terminal", "Franja Horaria", "Día de la Semana", "Estado"]})
+
+    reporte = {}
+    for nombre, df in (("texto", df_txt), ("categorico", df_cat)):
+        reporte[nombre] = {
+            "bytes_por_fila": df.memory_usage(deep=True).sum() / num_filas,
+            "filtro_s": _medir(lambda: df[df["Terminal"] == "Centro"]),
+            "groupby_s": _medir(
+                lambda: df.groupby(["Terminal", "Franja Horaria"], observed=True)["Personas Actuales"].mean()
+            ),
+        }
+
+    print(f"Reporte de esquema con {num_filas} filas:")
+    print(f"{'':<12}{'bytes/fila':>12}{'filtro (s)':>12}{'groupby (s)':>13}")
+    for nombre, valores in reporte.items():
+        print(f"{nombre:<12}{valores['bytes_por_fila']:>12.1f}{valores['filtro_s']:>12.4f}{valores['groupby_s']:>13.4f}")
+
+    return reporte
+
+
+if __name__ == "__main__":
+    reporte_esquema()
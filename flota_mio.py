@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# FLOTA DE MODELOS POR TERMINAL (O POR GRUPO DE TERMINALES)
+#
+#   python flota_mio.py entrenar --procesos 8                  (todas las terminales)
+#   python flota_mio.py entrenar --terminales "Centro" "Capri"  (solo esas; el resto no se toca)
+#   python flota_mio.py predecir --dias 5
+#
+# Cada miembro es un ModeloPredictivoMIO_sklearn pequeño entrenado solo con los
+# registros de su terminal (o grupo), leídos directamente del almacén por su
+# proceso trabajador, y guardado en su propio archivo. El índice flota.json dice
+# qué archivo atiende cada terminal. Al predecir, las filas se agrupan por
+# miembro y cada uno predice su bloque de una vez.
+
+RUTA_FLOTA = "modelos_flota"
+ARCHIVO_INDICE = "flota.json"
+
+# Árboles más pequeños que los del modelo global: cada miembro ve una sola terminal
+HIPERPARAMETROS_MIEMBRO = {
+    "random_forest": {"n_estimators": 50, "max_depth": 12},
+    "hist_gb": {"max_iter": 100},
+    "lineal": {},
+}
+
+
+def _nombre_archivo(grupo):
+    """Nombre de archivo estable y sin acentos para un grupo ('Terminal Andrés Sanín' → terminal_andres_sanin)"""
+    ascii_ = unicodedata.normalize("NFKD", grupo).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", ascii_.lower()).strip("_") + ".joblib"
+
+
+# ============================================================
+# 🏋️ ENTRENAMIENTO DE UN MIEMBRO (EN UN PROCESO TRABAJADOR)
+# ============================================================
+def _entrenar_miembro(grupo, terminales, backend, ruta):
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    inicio = time.perf_counter()
+    modelo = ModeloPredictivoMIO_sklearn(
+        terminales=terminales, backend=backend, nucleos=1, archivo_config=None
+    )
+    if modelo.df.empty:
+        return grupo, None
+
+    for tarea in ("ocupacion", "colapso"):
+        modelo.hiperparametros[tarea].update(HIPERPARAMETROS_MIEMBRO[backend])
+
+    modelo.entrenar_modelos(paralelo=False)
+    archivo = _nombre_archivo(grupo)
+    modelo.guardar_modelo(os.path.join(ruta, archivo))
+
+    return grupo, {
+        "terminales": list(terminales),
+        "archivo": archivo,
+        "version": modelo.version_modelo(),
+        "backend": backend,
+        "filas": len(modelo.df),
+        "segundos": time.perf_counter() - inicio,
+        "r2_ocupacion": modelo.metricas.get("r2_ocupacion"),
+        "f1_colapso": modelo.metricas.get("f1_colapso"),
+    }
+
+
+def _leer_indice(ruta):
+    archivo = os.path.join(ruta, ARCHIVO_INDICE)
+    if not os.path.exists(archivo):
+        return {}
+    with open(archivo, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def entrenar_flota(terminales=None, grupos=None, backend="random_forest", procesos=None, ruta=RUTA_FLOTA):
+    """
+    Entrena (o reentrena) un miembro por terminal, o uno por grupo si se pasa
+    grupos = {nombre: [terminales]}. Con terminales solo se reentrenan los miembros
+    que las contienen; los demás archivos y su entrada en el índice no cambian.
+    """
+    from almacen_mio import cargar_datos_limpios
+
+    if grupos is None:
+        if terminales is None:
+            terminales = [str(t) for t in cargar_datos_limpios(columnas=["Terminal"])["Terminal"].unique()]
+        grupos = {str(t): [str(t)] for t in terminales}
+    elif terminales is not None:
+        grupos = {nombre: lista for nombre, lista in grupos.items() if set(lista) & set(terminales)}
+
+    os.makedirs(ruta, exist_ok=True)
+    procesos = min(procesos or os.cpu_count() or 1, len(grupos)) or 1
+    inicio = time.perf_counter()
+    print(f"Entrenando {len(grupos)} miembros de la flota con {procesos} procesos...")
+
+    if procesos < 2:
+        resultados = [_entrenar_miembro(nombre, lista, backend, ruta) for nombre, lista in grupos.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            tareas = [ejecutor.submit(_entrenar_miembro, nombre, lista, backend, ruta)
+                      for nombre, lista in grupos.items()]
+            resultados = [tarea.result() for tarea in tareas]
+
+    # Solo se reemplazan las entradas de los miembros entrenados ahora
+    indice = _leer_indice(ruta)
+    for grupo, entrada in resultados:
+        if entrada is None:
+            print(f"⚠️ Sin datos para '{grupo}'; no se entrenó.")
+            continue
+        indice[grupo] = entrada
+        print(f"{grupo:<30} {entrada['filas']:>9} filas  {entrada['segundos']:>6.2f} s  "
+              f"R² = {entrada['r2_ocupacion']:.3f}")
+
+    with open(os.path.join(ruta, ARCHIVO_INDICE), "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+
+    print(f"Flota entrenada en {time.perf_counter() - inicio:.1f} s → '{ruta}'")
+    return indice
+
+
+# ============================================================
+# 🔀 ENRUTADOR
+# ============================================================
+class FlotaModelos:
+    """Modelos cargados por grupo y la terminal → grupo que los enruta"""
+
+    def __init__(self, miembros, grupo_de_terminal):
+        self.miembros = miembros
+        self.grupo_de_terminal = grupo_de_terminal
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_FLOTA):
+        from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+        indice = _leer_indice(ruta)
+        if not indice:
+            raise FileNotFoundError(f"No hay flota entrenada en '{ruta}' (python flota_mio.py entrenar).")
+
+        miembros, grupo_de_terminal = {}, {}
+        for grupo, entrada in indice.items():
+            miembro = ModeloPredictivoMIO_sklearn(backend=entrada["backend"], cargar_datos=False)
+            miembro.cargar_modelo(os.path.join(ruta, entrada["archivo"]), mmap_mode="r")
+            miembros[grupo] = miembro
+            for terminal in entrada["terminales"]:
+                grupo_de_terminal[terminal] = grupo
+        return cls(miembros, grupo_de_terminal)
+
+    def predecir(self, df, respaldo=None, n_jobs=None):
+        """
+        Ocupación y probabilidad de colapso por fila de df (escenarios completos), con como
+        mucho n_jobs hilos por miembro. Las filas de terminales sin miembro van al modelo
+        `respaldo`; sin respaldo es un error.
+        """
+        ocupacion = np.empty(len(df))
+        prob_colapso = np.full(len(df), np.nan)
+
+        grupos = df["Terminal"].astype(str).map(self.grupo_de_terminal).to_numpy()
+        sin_miembro = pd.isna(grupos)
+        if sin_miembro.any() and respaldo is None:
+            faltantes = sorted(df.loc[sin_miembro, "Terminal"].astype(str).unique())
+            raise ValueError(f"Terminales sin modelo en la flota: {', '.join(faltantes)}")
+
+        # Un solo lote por miembro (posiciones de sus filas) y otro para el respaldo
+        posiciones = pd.Series(np.arange(len(df))).groupby(grupos, dropna=True).indices
+        bloques = [(self.miembros[g], idx) for g, idx in posiciones.items()]
+        if sin_miembro.any():
+            bloques.append((respaldo, np.flatnonzero(sin_miembro)))
+
+        for modelo, idx in bloques:
+            X = modelo._preparar_features(df.iloc[idx], entrenar=False)
+            ocupacion[idx], prob = modelo._predecir_matriz(X, n_jobs)
+            if prob is not None:
+                prob_colapso[idx] = prob
+
+        return ocupacion, prob_colapso
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flota de modelos por terminal del MIO")
+    modos = parser.add_subparsers(dest="modo", required=True)
+
+    p_entrenar = modos.add_parser("entrenar", help="Entrenar o reentrenar miembros de la flota")
+    p_entrenar.add_argument("--terminales", nargs="+", default=None,
+                            help="Solo estas terminales (por defecto, todas)")
+    p_entrenar.add_argument("--backend", choices=["random_forest", "hist_gb", "lineal"], default="random_forest")
+    p_entrenar.add_argument("--procesos", type=int, default=None)
+
+    p_predecir = modos.add_parser("predecir", help="Predecir los próximos días con la flota")
+    p_predecir.add_argument("--dias", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    from pipeline_mio import asegurar_datos
+
+    asegurar_datos()
+    if args.modo == "entrenar":
+        entrenar_flota(terminales=args.terminales, backend=args.backend, procesos=args.procesos)
+    else:
+        from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+        modelo = ModeloPredictivoMIO_sklearn(usar_flota=True)
+        modelo.predecir(dias_futuros=args.dias)
+        modelo.guardar_predicciones()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# INSTRUMENTACIÓN DE ETAPAS (DURACIÓN, FILAS Y MEMORIA) EN JSONL
+#
+# Se activa con la variable de entorno antes de iniciar el programa:
+#
+#   VISIONCALI_TRAZAS=1 python Menu.py                  (escribe trazas_mio.jsonl)
+#   VISIONCALI_TRAZAS=/tmp/menu.jsonl python Menu.py    (archivo propio)
+#
+# El decorador decide al importar el módulo: si las trazas están apagadas devuelve
+# la función original, sin envoltura, así que el costo en ejecución es cero.
+
+VARIABLE_TRAZAS = "VISIONCALI_TRAZAS"
+ARCHIVO_TRAZAS = "trazas_mio.jsonl"
+
+_candado = threading.Lock()
+
+
+def trazas_activas():
+    return os.environ.get(VARIABLE_TRAZAS, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def archivo_trazas():
+    valor = os.environ.get(VARIABLE_TRAZAS, "").strip()
+    return ARCHIVO_TRAZAS if valor.lower() in ("1", "true", "si", "sí") else valor
+
+
+def rss_mb():
+    """Memoria residente actual del proceso (solo Linux; None en otros sistemas)"""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _contar_filas(resultado):
+    if resultado is None or isinstance(resultado, (str, bytes, dict)):
+        return None
+    try:
+        return len(resultado)
+    except TypeError:
+        return None
+
+
+def registrar(evento, archivo=None):
+    """Anexa un evento como una línea JSON (seguro entre hilos)"""
+    linea = json.dumps(evento, ensure_ascii=False, default=str)
+    with _candado:
+        with open(archivo or archivo_trazas(), "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+
+# ============================================================
+# ⏱️ CONTEXTO Y DECORADOR
+# ============================================================
+@contextmanager
+def etapa(nombre, filas=None):
+    """
+    Mide un bloque de código. Quien lo usa puede completar registro["filas"] dentro
+    del bloque. Con las trazas apagadas no mide ni escribe nada.
+    """
+    registro = {"etapa": nombre, "filas": filas}
+    if not trazas_activas():
+        yield registro
+        return
+
+    inicio = time.perf_counter()
+    rss_inicio = rss_mb()
+    registro["inicio"] = datetime.now().isoformat(timespec="milliseconds")
+    try:
+        yield registro
+    except BaseException as e:
+        registro["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        rss_fin = rss_mb()
+        registro["segundos"] = round(time.perf_counter() - inicio, 6)
+        registro["memoria_delta_mb"] = None if rss_inicio is None else round(rss_fin - rss_inicio, 3)
+        registro["memoria_mb"] = None if rss_fin is None else round(rss_fin, 3)
+        registro["pid"] = os.getpid()
+        registro["hilo"] = threading.current_thread().name
+        registrar(registro)
+
+
+def instrumentar(nombre=None, filas=None):
+    """
+    Decorador de etapas. filas puede ser una función (resultado, *args, **kwargs) -> int;
+    por defecto se usa len(resultado) cuando existe.
+    """
+    def decorador(funcion):
+        if not trazas_activas():
+            return funcion
+
+        nombre_etapa = nombre or f"{funcion.__module__}.{funcion.__qualname__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre_etapa) as registro:
+                resultado = funcion(*args, **kwargs)
+                registro["filas"] = (
+                    filas(resultado, *args, **kwargs) if filas is not None else _contar_filas(resultado)
+                )
+            return resultado
+
+        return envoltura
+
+    return decorador
@@ -2,7 +2,105 @@ import pandas as pd
 import numpy as np
 import openpyxl
 import calendar 
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from almacen_mio import RUTA_DATOS_LIMPIOS, borrar_almacen, guardar_particionado, siguiente_parte
+from nulos_mio import ARCHIVO_NULOS, RegistroNulos
+from instrumentacion_mio import instrumentar
+from esquema_mio import (
+    TERMINALES, FRANJAS, FRANJA_DESCONOCIDA, TIPO_TERMINAL, TIPO_FRANJA, TIPO_ESTADO,
+    aplicar_esquema, dias_semana
+)
+
+
+ARCHIVO_MARCA_AGUA = "marca_agua_mio.json"
+
+
+# MEDIANA ACUMULABLE PARA LA LIMPIEZA INCREMENTAL
+
+class MedianaAproximada:
+    """
+    Mediana mantenida con un histograma de ancho fijo: se actualiza con cada lote
+    nuevo sin volver a leer el histórico (exacta para conteos enteros con ancho 1).
+    """
+
+    def __init__(self, ancho=1.0, conteos=None):
+        self.ancho = ancho
+        self.conteos = np.zeros(0, dtype=np.int64) if conteos is None else np.asarray(conteos, dtype=np.int64)
+
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return
+
+        nuevos = np.bincount(np.floor(np.clip(valores, 0, None) / self.ancho).astype(np.int64))
+        if len(nuevos) > len(self.conteos):
+            self.conteos = np.pad(self.conteos, (0, len(nuevos) - len(self.conteos)))
+        self.conteos[:len(nuevos)] += nuevos
+
+    def combinar(self, otra):
+        """Suma el histograma de otra mediana con el mismo ancho (p. ej. de otro proceso)"""
+        if len(otra.conteos) > len(self.conteos):
+            self.conteos = np.pad(self.conteos, (0, len(otra.conteos) - len(self.conteos)))
+        self.conteos[:len(otra.conteos)] += otra.conteos
+
+    def mediana(self):
+        """Como Series.median(): con un total par, el promedio de los dos valores centrales"""
+        total = self.conteos.sum()
+        if total == 0:
+            return np.nan
+
+        acumulado = np.cumsum(self.conteos)
+        bajo, alto = np.searchsorted(acumulado, [(total - 1) // 2, total // 2], side="right")
+        return float((bajo + alto) / 2 * self.ancho)
+
+    def a_dict(self):
+        return {"ancho": self.ancho, "conteos": self.conteos.tolist()}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos["ancho"], datos["conteos"])
+
+
+def cargar_marca_agua(archivo=ARCHIVO_MARCA_AGUA):
+    """Última fecha procesada y mediana acumulada (None si nunca se ha limpiado)"""
+    if not os.path.exists(archivo):
+        return None, MedianaAproximada()
+
+    with open(archivo, encoding="utf-8") as f:
+        estado = json.load(f)
+
+    return pd.Timestamp(estado["ultima_fecha"]), MedianaAproximada.desde_dict(estado["mediana"])
+
+
+def guardar_marca_agua(ultima_fecha, mediana, archivo=ARCHIVO_MARCA_AGUA):
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump({"ultima_fecha": str(pd.Timestamp(ultima_fecha).date()), "mediana": mediana.a_dict()}, f)
+
+
+def archivo_del_almacen(archivo, ruta=RUTA_DATOS_LIMPIOS):
+    """
+    Archivo auxiliar (marca de agua, registro de nulos) de un almacén: junto a él y con
+    su nombre como prefijo. El almacén por defecto conserva los nombres de siempre.
+    """
+    if os.path.normpath(ruta) == os.path.normpath(RUTA_DATOS_LIMPIOS):
+        return archivo
+    return f"{os.path.normpath(ruta)}_{archivo}"
+
+
+def _guardar_auxiliares(ruta, ultima_fecha, mediana, nulos):
+    """Marca de agua (para las limpiezas incrementales posteriores) y registro de nulos del almacén"""
+    marca_agua = archivo_del_almacen(ARCHIVO_MARCA_AGUA, ruta)
+    if ultima_fecha is None or pd.isna(ultima_fecha):
+        # Almacén vacío: sin marca, la próxima limpieza incremental lo procesa todo
+        if os.path.exists(marca_agua):
+            os.remove(marca_agua)
+    else:
+        guardar_marca_agua(ultima_fecha, mediana, marca_agua)
+    nulos.guardar(archivo_del_almacen(ARCHIVO_NULOS, ruta))
 
 
 # CLASE OBJETO DE DATOS
@@ -11,7 +109,8 @@ class ObjetoDeDatos:
     def __init__(self, dataframe):
         self.dataframe = dataframe
 
-    def limpiar_datos(self):
+    @instrumentar(filas=lambda resultado, objeto, *args, **kwargs: len(objeto.dataframe))
+    def limpiar_datos(self, mediana_personas=None):
         """Limpia los datos y conserva solo la última observación por terminal"""
         df_limpio = self.dataframe.copy()
 
@@ -24,125 +123,337 @@ class ObjetoDeDatos:
         # Asegurar tipos de datos correctos
         df_limpio["Personas Actuales"] = df_limpio["Personas Actuales"].astype(float)
 
-        # Rellenar valores faltantes
-        mediana_personas = df_limpio["Personas Actuales"].median()
+        # Rellenar valores faltantes (la limpieza incremental pasa la mediana acumulada)
+        if mediana_personas is None:
+            mediana_personas = df_limpio["Personas Actuales"].median()
         df_limpio["Personas Actuales"] = df_limpio["Personas Actuales"].fillna(mediana_personas)
-        df_limpio["Franja Horaria"] = df_limpio["Franja Horaria"].fillna("Desconocida")
+        aplicar_esquema(df_limpio)
+        df_limpio["Franja Horaria"] = df_limpio["Franja Horaria"].fillna(FRANJA_DESCONOCIDA)
         df_limpio = df_limpio.dropna(subset=["Estado"])
 
         # Asegurar que la fecha esté sin hora (solo año-mes-día)
-        df_limpio["Fecha"] = pd.to_datetime(df_limpio["Fecha"]).dt.date
+        df_limpio["Fecha"] = pd.to_datetime(df_limpio["Fecha"]).dt.normalize()
 
         # Devolver el DataFrame limpio
         return df_limpio
 
+    @instrumentar()
+    def limpiar_incremental(self, ruta=RUTA_DATOS_LIMPIOS, archivo_estado=None):
+        """
+        Limpia solo las filas posteriores a la marca de agua, las anexa al almacén
+        limpio y avanza la marca. El costo depende de los datos nuevos, no del histórico.
+        """
+        archivo_estado = archivo_estado or archivo_del_almacen(ARCHIVO_MARCA_AGUA, ruta)
+        ultima_fecha, mediana = cargar_marca_agua(archivo_estado)
+
+        fechas = pd.to_datetime(self.dataframe["Fecha"]).dt.normalize()
+        df_nuevo = self.dataframe if ultima_fecha is None else self.dataframe[fechas > ultima_fecha]
+
+        if df_nuevo.empty:
+            print("No hay registros nuevos desde la última limpieza.")
+            return df_nuevo
+
+        mediana.actualizar(df_nuevo["Personas Actuales"])
+        df_limpio = ObjetoDeDatos(df_nuevo).limpiar_datos(mediana_personas=mediana.mediana())
+
+        guardar_particionado(df_limpio, ruta, parte=siguiente_parte(ruta))
+        guardar_marca_agua(fechas.loc[df_nuevo.index].max(), mediana, archivo_estado)
+
+        print(f"Limpieza incremental: {len(df_limpio)} registros nuevos anexados a '{ruta}'.")
+        return df_limpio
+
 
  
 # DATOS DE TERMINALES SIMULADOS - CON ALTA VARIABILIDAD
 
-nombres_terminales = [
-    "Terminal Paso del Comercio", "Terminal Menga", "Terminal Andrés Sanín",
-    "Terminal Simón Bolívar", "Terminal Aguablanca", "Centro", "Plaza de Caycedo",
-    "Santa Rosa", "Universidades", "Univalle", "Manzana del Saber", "Meléndez",
-    "Estadio", "Unidad Deportiva", "Versalles", "Las Américas", "Torre de Cali",
-    "Flora Industrial", "Chiminangos", "San Bosco", "Salomia", "Popular", "Manzanares",
-    "Fátima", "Piloto", "San Nicolás", "Río Cali", "Plaza de Toros", "Refugio",
-    "Capri", "Álamos", "Vipasa", "Prados del Norte", "Calipso", "Villa del Lago",
-    "Lleras Restrepo", "Ciudad Modelo", "Villa del Sur", "Mariano Ramos", "Cañaverales"
-]
+nombres_terminales = TERMINALES
 
 num_datos = 1_000_00
-np.random.seed(42)
-
-terminales_random = np.random.choice(nombres_terminales, num_datos)
-capacidades = np.random.randint(80, 200, num_datos)
-
-# MEJORADO: Generar ocupación con MAYOR VARIABILIDAD
-# Esto garantiza que habrá suficientes casos de colapso
-personas = []
-for i, cap in enumerate(capacidades):
-    # ESTRATEGIA: Diferentes escenarios según posición
-    rand = np.random.random()
-    
-    if rand < 0.40:  # 40% - Ocupación normal-baja (40-70%)
-        ocupacion = np.random.uniform(0.40, 0.70)
-    elif rand < 0.70:  # 30% - Ocupación normal-alta (70-90%)
-        ocupacion = np.random.uniform(0.70, 0.90)
-    elif rand < 0.85:  # 15% - Ocupación crítica (90-110%)
-        ocupacion = np.random.uniform(0.90, 1.10)
-    else:  # 15% - Sobrecapacidad/Colapso (110-160%)
-        ocupacion = np.random.uniform(1.10, 1.60)
-    
-    personas.append(int(cap * ocupacion))
-
-personas = np.array(personas)
-
-# Estado con umbral en 95%
-estado = np.where(personas > capacidades * 0.95, "Colapsada", "Estable")
-
-# Fechas entre hace 2 años y hoy (sin hora)
-fecha_fin = datetime.now().date()
-fecha_inicio = fecha_fin - timedelta(days=1825)
-fechas_secuenciales = pd.date_range(start=fecha_inicio, end=fecha_fin, periods=num_datos)
-
-FRANJAS_DISPONIBLES = [
-    "05:30-09:00", "09:00-12:00", "12:00-15:00",
-    "15:00-18:00", "18:00-21:00", "21:00-23:00"
-]
-
-df_terminales = pd.DataFrame({
-    "Terminal": terminales_random,
-    "Capacidad Máxima": capacidades,
-    "Personas Actuales": personas,
-    "Estado": estado,
-    "Franja Horaria": np.random.choice(FRANJAS_DISPONIBLES, num_datos),
-    "Fecha": [f.date() for f in fechas_secuenciales]
-})
-
-df_terminales["Día de la Semana"] = pd.to_datetime(df_terminales["Fecha"]).dt.day_name()
-
-print(f"Se generaron {len(df_terminales)} registros de simulación.")
-print(f"Rango de fechas: {df_terminales['Fecha'].min()} → {df_terminales['Fecha'].max()}")
-
-
-
-# Introducir valores nulos (5%)
-num_nulls = int(num_datos * 0.05)
-indices_nulls_personas = df_terminales.sample(n=num_nulls, random_state=42).index
-indices_nulls_franja = df_terminales.sample(n=num_nulls, random_state=43).index
-indices_nulls_estado = df_terminales.sample(n=num_nulls, random_state=44).index
-
-df_terminales.loc[indices_nulls_personas, "Personas Actuales"] = None
-df_terminales.loc[indices_nulls_franja, "Franja Horaria"] = None
-df_terminales.loc[indices_nulls_estado, "Estado"] = None
-
-df_nulos = df_terminales.isnull().astype(int)
+SEMILLA = 42
+
+# Escenarios de ocupación: (probabilidad acumulada, ocupación mínima, ocupación máxima)
+# 40% normal-baja, 30% normal-alta, 15% crítica y 15% sobrecapacidad/colapso
+ESCENARIOS_OCUPACION = np.array([
+    [0.40, 0.40, 0.70],
+    [0.70, 0.70, 0.90],
+    [0.85, 0.90, 1.10],
+    [1.00, 1.10, 1.60],
+])
+
+
+def simular_ocupacion(capacidades, rng):
+    """Genera las personas actuales de todas las filas en un solo lote vectorizado"""
+    n = len(capacidades)
+
+    # Escenario de cada fila según un número aleatorio uniforme
+    escenario = np.searchsorted(ESCENARIOS_OCUPACION[:, 0], rng.random(n), side="right")
+    minimo = ESCENARIOS_OCUPACION[escenario, 1]
+    maximo = ESCENARIOS_OCUPACION[escenario, 2]
+
+    ocupacion = rng.uniform(minimo, maximo)
+    return (capacidades * ocupacion).astype(np.int64)
+
+
+def calcular_estado(personas, capacidades):
+    """Estado con umbral en 95% de la capacidad (categórico: 0 = Estable, 1 = Colapsada)"""
+    colapsada = (personas > capacidades * 0.95).astype(np.int8)
+    return pd.Categorical.from_codes(colapsada, dtype=TIPO_ESTADO)
+
+
+FRANJAS_DISPONIBLES = FRANJAS
+
+
+PROPORCION_NULOS = 0.05
+COLUMNAS_CON_NULOS = ["Personas Actuales", "Franja Horaria", "Estado"]
+
+
+def rango_fechas():
+    """Fechas entre hace 5 años y hoy (sin hora)"""
+    fecha_fin = pd.Timestamp(datetime.now().date())
+    fecha_inicio = fecha_fin - pd.Timedelta(days=1825)
+    return fecha_inicio, fecha_fin
+
+
+def _fechas_bloque(inicio, fin, num_datos, fecha_inicio, fecha_fin):
+    """Fechas de las posiciones [inicio, fin) dentro del rango lineal de num_datos fechas"""
+    posiciones = np.arange(inicio, fin, dtype=np.float64)
+    paso = (fecha_fin.value - fecha_inicio.value) / max(num_datos - 1, 1)
+    nanosegundos = fecha_inicio.value + posiciones * paso
+    return pd.DatetimeIndex(nanosegundos.astype("datetime64[ns]")).normalize()
+
+
+def _simular_bloque(rng, inicio, fin, num_datos, fecha_inicio, fecha_fin):
+    """Simula las filas [inicio, fin) de una simulación de num_datos filas"""
+    n = fin - inicio
+
+    terminales_random = pd.Categorical.from_codes(rng.integers(0, len(nombres_terminales), n), dtype=TIPO_TERMINAL)
+    capacidades = rng.integers(80, 200, n)
+
+    # MEJORADO: Generar ocupación con MAYOR VARIABILIDAD
+    # Esto garantiza que habrá suficientes casos de colapso
+    personas = simular_ocupacion(capacidades, rng)
+    estado = calcular_estado(personas, capacidades)
+
+    fechas = _fechas_bloque(inicio, fin, num_datos, fecha_inicio, fecha_fin)
+
+    return pd.DataFrame({
+        "Terminal": terminales_random,
+        "Capacidad Máxima": capacidades,
+        "Personas Actuales": personas,
+        "Estado": estado,
+        "Franja Horaria": pd.Categorical.from_codes(rng.integers(0, len(FRANJAS_DISPONIBLES), n), dtype=TIPO_FRANJA),
+        "Fecha": fechas,
+        "Día de la Semana": dias_semana(fechas)
+    }, index=pd.RangeIndex(inicio, fin))
+
+
+def simular_terminales(num_datos=num_datos, semilla=SEMILLA):
+    """Genera la simulación completa de terminales con un generador NumPy con semilla"""
+    rng = np.random.default_rng(semilla)
+    fecha_inicio, fecha_fin = rango_fechas()
+    return _simular_bloque(rng, 0, num_datos, num_datos, fecha_inicio, fecha_fin)
+
+
+def inyectar_nulos(df, rng, proporcion=PROPORCION_NULOS):
+    """Introduce valores nulos en la misma proporción para cada columna afectada"""
+    num_nulls = int(len(df) * proporcion)
+    df["Personas Actuales"] = df["Personas Actuales"].astype(float)
+
+    for col in COLUMNAS_CON_NULOS:
+        posiciones = rng.choice(len(df), size=num_nulls, replace=False)
+        df.iloc[posiciones, df.columns.get_loc(col)] = None
+
+    return df
+
 
 # ============================================================
-# 🧹 LIMPIAR DATOS
+# 🔁 GENERACIÓN POR BLOQUES (MEMORIA ACOTADA)
 # ============================================================
-objeto_datos = ObjetoDeDatos(df_terminales)
-df_limpio = objeto_datos.limpiar_datos()
-
-# Crear DataFrame con el último día disponible por terminal
-df_ultimo_dia_ejemplo = (
-    df_limpio.sort_values("Fecha")
-    .groupby("Terminal")
-    .tail(1)
-)
+def _rangos_bloques(num_datos, tamano_bloque, semilla):
+    """
+    Rangos de filas de cada bloque con su semilla hija independiente derivada de la
+    semilla maestra: cada bloque da el mismo resultado sin importar quién lo genere.
+    """
+    inicios = range(0, num_datos, tamano_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(len(inicios))
+    return [
+        (i, inicio, min(inicio + tamano_bloque, num_datos), semilla_hija)
+        for i, (inicio, semilla_hija) in enumerate(zip(inicios, semillas))
+    ]
+
+
+def _generar_bloque(inicio, fin, num_datos, semilla_hija, fecha_inicio, fecha_fin):
+    rng = np.random.default_rng(semilla_hija)
+    df_bloque = _simular_bloque(rng, inicio, fin, num_datos, fecha_inicio, fecha_fin)
+    df_bloque = inyectar_nulos(df_bloque, rng)
+    return df_bloque, ObjetoDeDatos(df_bloque).limpiar_datos()
+
+
+def generar_por_bloques(num_datos=num_datos, tamano_bloque=1_000_000, semilla=SEMILLA):
+    """
+    Genera la simulación en bloques de tamaño fijo sobre el mismo rango de 5 años.
+    Cada bloque se entrega como (datos con nulos, datos limpios), así la memoria
+    depende del tamaño del bloque y no del total de filas.
+    """
+    fecha_inicio, fecha_fin = rango_fechas()
+
+    for _, inicio, fin, semilla_hija in _rangos_bloques(num_datos, tamano_bloque, semilla):
+        yield _generar_bloque(inicio, fin, num_datos, semilla_hija, fecha_inicio, fecha_fin)
+
+
+@instrumentar(filas=lambda total, *args, **kwargs: total)
+def escribir_por_bloques(ruta=RUTA_DATOS_LIMPIOS, num_datos=num_datos,
+                         tamano_bloque=1_000_000, semilla=SEMILLA):
+    """Escribe los datos limpios en el almacén Parquet bloque a bloque y devuelve las filas escritas"""
+    borrar_almacen(ruta)
+    total = 0
+    mediana = MedianaAproximada()
+    nulos = RegistroNulos(COLUMNAS_CON_NULOS)
+    ultima_fecha = None
+
+    for i, (df_bloque, df_bloque_limpio) in enumerate(generar_por_bloques(num_datos, tamano_bloque, semilla)):
+        guardar_particionado(df_bloque_limpio, ruta, parte=i)
+        mediana.actualizar(df_bloque["Personas Actuales"])
+        nulos.registrar(df_bloque)
+        total += len(df_bloque_limpio)
+        ultima_fecha = df_bloque_limpio["Fecha"].max()
+
+    _guardar_auxiliares(ruta, ultima_fecha, mediana, nulos)
+
+    print(f"Almacén '{ruta}' generado por bloques: {total} registros limpios.")
+    return total
+
+
+# ============================================================
+# ⚡ GENERACIÓN EN PARALELO (VARIOS NÚCLEOS)
+# ============================================================
+def _escribir_fragmento(tarea):
+    """Genera, limpia y escribe un bloque en su propio archivo del almacén (proceso hijo)"""
+    i, inicio, fin, semilla_hija, num_datos, fecha_inicio, fecha_fin, ruta = tarea
+
+    df_bloque, df_bloque_limpio = _generar_bloque(inicio, fin, num_datos, semilla_hija, fecha_inicio, fecha_fin)
+    guardar_particionado(df_bloque_limpio, ruta, parte=i)
+
+    mediana = MedianaAproximada()
+    mediana.actualizar(df_bloque["Personas Actuales"])
+
+    nulos = RegistroNulos(COLUMNAS_CON_NULOS)
+    nulos.registrar(df_bloque, desplazamiento=inicio)
+    return len(df_bloque_limpio), mediana, nulos, df_bloque_limpio["Fecha"].max()
+
+
+@instrumentar(filas=lambda total, *args, **kwargs: total)
+def simular_en_paralelo(ruta=RUTA_DATOS_LIMPIOS, num_datos=num_datos, tamano_bloque=1_000_000,
+                        semilla=SEMILLA, procesos=None):
+    """
+    Reparte los bloques (rangos de fechas contiguos) entre procesos. Como cada bloque
+    tiene su semilla hija fija, el almacén resultante es idéntico bit a bit para una
+    misma semilla, con cualquier número de procesos, e igual al de escribir_por_bloques.
+    """
+    borrar_almacen(ruta)
+    fecha_inicio, fecha_fin = rango_fechas()
+
+    tareas = [
+        (i, inicio, fin, semilla_hija, num_datos, fecha_inicio, fecha_fin, ruta)
+        for i, inicio, fin, semilla_hija in _rangos_bloques(num_datos, tamano_bloque, semilla)
+    ]
+
+    total = 0
+    mediana = MedianaAproximada()
+    nulos = RegistroNulos(COLUMNAS_CON_NULOS)
+    ultima_fecha = None
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for filas, mediana_bloque, nulos_bloque, fecha_max in pool.map(_escribir_fragmento, tareas):
+            total += filas
+            mediana.combinar(mediana_bloque)
+            nulos.combinar(nulos_bloque)
+            ultima_fecha = fecha_max if ultima_fecha is None else max(ultima_fecha, fecha_max)
+
+    _guardar_auxiliares(ruta, ultima_fecha, mediana, nulos)
+
+    print(f"Almacén '{ruta}' generado en paralelo ({len(tareas)} bloques): {total} registros limpios.")
+    return total
+
+
+@instrumentar(filas=lambda resultado, df_terminales, *args, **kwargs: len(df_terminales))
+def exportar_excel(df_terminales, nulos, df_limpio, archivo="data_limpia_mio.xlsx"):
+    """
+    Exportación opcional a Excel; el almacén Parquet es la fuente de datos del modelo.
+    Los nulos se exportan como resúmenes del RegistroNulos, no como una matriz por fila.
+    """
+    with pd.ExcelWriter(archivo, engine="openpyxl") as writer:
+        df_terminales.to_excel(writer, sheet_name="Datos Originales", index=False)
+        nulos.resumen_por_columna().to_excel(writer, sheet_name="Resumen Nulos")
+        nulos.resumen_por_terminal().to_excel(writer, sheet_name="Nulos por Terminal")
+        df_limpio.to_excel(writer, sheet_name="Datos Limpios", index=False)
+
+    print(f"\nArchivo '{archivo}' generado exitosamente.")
+
+
+# ============================================================
+# 🧪 GENERAR DATOS
+# ============================================================
+@instrumentar()
+def generar_datos(num_datos=num_datos, semilla=SEMILLA):
+    """Simula las terminales e introduce valores nulos (5%)"""
+    df_terminales = simular_terminales(num_datos, semilla)
+
+    print(f"Se generaron {len(df_terminales)} registros de simulación.")
+    print(f"Rango de fechas: {df_terminales['Fecha'].min().date()} → {df_terminales['Fecha'].max().date()}")
+
+    # Introducir valores nulos (5%)
+    num_nulls = int(num_datos * PROPORCION_NULOS)
+    indices_nulls_personas = df_terminales.sample(n=num_nulls, random_state=42).index
+    indices_nulls_franja = df_terminales.sample(n=num_nulls, random_state=43).index
+    indices_nulls_estado = df_terminales.sample(n=num_nulls, random_state=44).index
+
+    df_terminales["Personas Actuales"] = df_terminales["Personas Actuales"].astype(float)
+    df_terminales.loc[indices_nulls_personas, "Personas Actuales"] = None
+    df_terminales.loc[indices_nulls_franja, "Franja Horaria"] = None
+    df_terminales.loc[indices_nulls_estado, "Estado"] = None
+
+    return df_terminales
+
 
 # ============================================================
-# 📤 EXPORTAR A EXCEL
+# 🧹 LIMPIAR DATOS
 # ============================================================
-with pd.ExcelWriter("data_limpia_mio.xlsx", engine="openpyxl") as writer:
-    df_terminales.to_excel(writer, sheet_name="Datos Originales", index=False)
-    df_nulos.to_excel(writer, sheet_name="Valores Nulos", index=False)
-    df_limpio.to_excel(writer, sheet_name="Datos Limpios", index=False)
+@instrumentar()
+def limpiar_y_guardar(df_terminales, ruta=RUTA_DATOS_LIMPIOS, exportar=False):
+    """Limpia los datos, los guarda en el almacén Parquet y opcionalmente exporta a Excel"""
+    objeto_datos = ObjetoDeDatos(df_terminales)
+    df_limpio = objeto_datos.limpiar_datos()
+
+    borrar_almacen(ruta)
+    guardar_particionado(df_limpio, ruta)
+    print(f"\nAlmacén '{ruta}' generado exitosamente.")
+
+    # Marca de agua y registro compacto de nulos (bitmaps por columna y conteos por terminal/día)
+    mediana = MedianaAproximada()
+    mediana.actualizar(df_terminales["Personas Actuales"])
+    nulos = RegistroNulos(COLUMNAS_CON_NULOS)
+    nulos.registrar(df_terminales)
+    _guardar_auxiliares(ruta, df_limpio["Fecha"].max(), mediana, nulos)
+
+    # Excel solo como exportación opcional
+    if exportar:
+        exportar_excel(df_terminales, nulos, df_limpio)
+
+    return df_limpio
+
+
+def ultimo_dia_por_terminal(df_limpio):
+    """DataFrame con el último día disponible por terminal"""
+    return (
+        df_limpio.sort_values("Fecha")
+        .groupby("Terminal")
+        .tail(1)
+    )
 
-print("\nArchivo 'data_limpia_mio.xlsx' generado exitosamente.")
 
 # ============================================================
 # 🧾 BLOQUE PRINCIPAL
 # ============================================================
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    limpiar_y_guardar(generar_datos())
@@ -5,6 +5,8 @@ import webbrowser
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import date
+from esquema_mio import aplicar_esquema
+from instrumentacion_mio import instrumentar
 
 
 # COORDENADAS DE ESTACIONES MIO
@@ -55,6 +57,7 @@ ESTACIONES_MIO = {
 
 # CARGAR Y PROCESAR DATOS
 
+@instrumentar()
 def cargar_predicciones():
     try:
         df = pd.read_excel("predicciones_mio.xlsx")
@@ -70,31 +73,33 @@ def cargar_predicciones():
     }, inplace=True)
 
     df["Fecha Predicha"] = pd.to_datetime(df["Fecha Predicha"])
-    return df
+    return aplicar_esquema(df)
 
 
+@instrumentar()
 def agregar_coordenadas(df, estaciones_dict):
     df_coords = pd.DataFrame.from_dict(
         estaciones_dict, orient="index", columns=["Latitud", "Longitud"]
     ).reset_index()
 
     df_coords.rename(columns={"index": "Terminal"}, inplace=True)
-    return pd.merge(df, df_coords, on="Terminal", how="left")
+    return aplicar_esquema(pd.merge(df, df_coords, on="Terminal", how="left"))
 
 
+@instrumentar(filas=lambda resultado, df, *args, **kwargs: len(df))
 def resumen_por_terminal(df, fecha):
     df_fecha = df[df["Fecha Predicha"].dt.date == fecha]
 
     resumen = []
-    for terminal, grupo in df_fecha.groupby("Terminal"):
+    for terminal, grupo in df_fecha.groupby("Terminal", observed=True):
 
         colapsadas = grupo.loc[
-            grupo["Estado Futuro"].str.contains("Colapsará", case=False, na=False),
+            grupo["Estado Futuro"] == "Colapsará",
             "Franja Horaria"
         ].tolist()
 
         estables = grupo.loc[
-            grupo["Estado Futuro"].str.contains("Estable", case=False, na=False),
+            grupo["Estado Futuro"] == "Estable",
             "Franja Horaria"
         ].tolist()
 
@@ -113,7 +118,8 @@ def resumen_por_terminal(df, fecha):
 
 # GENERACIÓN DEL MAPA
 
-def crear_mapa(df_resumen, filename="mapa_predicciones_mio.html"):
+@instrumentar(filas=lambda resultado, df_resumen, *args, **kwargs: len(df_resumen))
+def crear_mapa(df_resumen, filename="mapa_predicciones_mio.html", abrir_navegador=True):
 
     mapa = folium.Map(location=[3.4516, -76.5320], zoom_start=12, tiles="CartoDB positron")
 
@@ -140,7 +146,9 @@ def crear_mapa(df_resumen, filename="mapa_predicciones_mio.html"):
         ).add_to(mapa)
 
     mapa.save(filename)
-    webbrowser.open(filename)
+    if abrir_navegador:
+        webbrowser.open(filename)
+    return filename
 
 
 # ===============================================================
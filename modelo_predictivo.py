@@ -3,45 +3,267 @@ import numpy as np
 import warnings
 from datetime import timedelta
 import os
+import json
+import hashlib
+import time
+import joblib
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from almacen_mio import (
+    RUTA_PREDICCIONES, borrar_almacen, cargar_datos_limpios, contar_filas, fecha_maxima,
+    guardar_particionado
+)
+from esquema_mio import FRANJA_DESCONOCIDA, TIPO_ESTADO_PREVISTO, aplicar_esquema, dias_semana
+from instrumentacion_mio import instrumentar, rss_mb
+from bosque_compacto_mio import BosqueCompacto
+from cache_predicciones_mio import ARCHIVO_CACHE_PREDICCIONES, CachePredicciones
 # Scikit-learn imports
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.ensemble import (
+    RandomForestRegressor, RandomForestClassifier,
+    HistGradientBoostingRegressor, HistGradientBoostingClassifier
+)
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
-    mean_squared_error, r2_score, mean_absolute_error, classification_report
+    mean_squared_error, r2_score, mean_absolute_error, classification_report, f1_score
 )
+from threadpoolctl import threadpool_limits
 
 
 warnings.filterwarnings("ignore")
 
-if not os.path.exists("data_limpia_mio.xlsx"):
-    try:
-        from limpieza_mio import ObjetoDeDatos, df_terminales
-        objeto_datos = ObjetoDeDatos(df_terminales)
-        df_limpio = objeto_datos.limpiar_datos()  
-        if df_limpio is not None:
-            print("Archivo 'data_limpia_mio.xlsx' generado exitosamente.")
+# Columnas que el modelo lee del almacén (el resto no se carga)
+COLUMNAS_MODELO = [
+    "Terminal", "Fecha", "Franja Horaria", "Capacidad Máxima", "Personas Actuales"
+]
+
+# Orden fijo de las columnas de la matriz de features (la ocupación solo para colapso)
+CATEGORICAS = ["Terminal", "Franja Horaria", "Día de la Semana"]
+COLUMNAS_FEATURES = ["Capacidad Máxima"] + [f"{col}_encoded" for col in CATEGORICAS]
+COLUMNAS_COLAPSO = COLUMNAS_FEATURES + ["Ocupacion"]
+
+# Posiciones de las columnas categóricas en la matriz (soporte nativo en hist_gb)
+INDICES_CATEGORICAS = list(range(1, len(CATEGORICAS) + 1))
+
+# Probabilidad a partir de la cual se prevé colapso (Estado_Previsto = "Colapsará")
+UMBRAL_COLAPSO = 0.75
+
+# Cambia cuando cambia el formato de los artefactos (invalida la caché de modelos)
+FORMATO_ARTEFACTOS = 2
+
+ARCHIVO_MODELO = "modelo_mio.joblib"
+ARCHIVO_MODELO_COMPACTO = "modelo_compacto_mio.npz"
+
+# Artefactos versionados: un archivo por huella de (datos de entrenamiento, hiperparámetros)
+RUTA_CACHE_MODELOS = "modelos_cache"
+
+# Todo lo que hace falta para predecir sin volver a entrenar
+ARTEFACTOS_MODELO = [
+    "modelo_ocupacion", "modelo_colapso", "scaler_ocupacion",
+    "scaler_colapso", "label_encoders", "columnas_colapso", "backend",
+    "fecha_entrenada"
+]
+
+BACKENDS = ["random_forest", "hist_gb", "lineal"]
+
+# Backends que actualizar_incremental sabe ampliar sin alterar lo ya aprendido
+BACKENDS_INCREMENTALES = ["random_forest"]
+
+
+# Memoria estimada por fila en cada etapa (bytes; normal / bajo_consumo), medida con
+# 1,8 M de filas. Solo datos y features: el tamaño de los bosques va aparte
+BYTES_POR_FILA = {
+    "carga": {False: 170, True: 105},
+    "features": {False: 70, True: 65},
+    "prediccion": {False: 120, True: 40},
+}
+
+# Filas por llamada a predict en bajo_consumo
+FILAS_BLOQUE_BAJO_CONSUMO = 200_000
+
+
+def _reducir_numerico(serie):
+    """int16 si todos los valores son enteros que caben; si no, float32"""
+    valores = serie.to_numpy()
+    limites = np.iinfo(np.int16)
+    if (len(valores) and np.all(np.mod(valores, 1) == 0)
+            and limites.min <= valores.min() and valores.max() <= limites.max):
+        return valores.astype(np.int16)
+    return valores.astype(np.float32)
+
+
+def _hash_datos(df):
+    """
+    Hash por fila de COLUMNAS_MODELO con las numéricas en float64: los mismos datos dan
+    el mismo hash con o sin bajo_consumo (que reduce esas columnas a int16/float32)
+    """
+    columnas = df[COLUMNAS_MODELO].astype({"Capacidad Máxima": np.float64, "Personas Actuales": np.float64})
+    return pd.util.hash_pandas_object(columnas, index=False).to_numpy().tobytes()
+
+
+def _filas_historia(resultado, modelo, *args, **kwargs):
+    """Filas de historia del modelo (para la instrumentación de etapas)"""
+    return len(modelo.df)
+
+
+HIPERPARAMETROS_BOSQUE = {
+    "n_estimators": 100,     # numeros de arboles
+    "max_depth": 20,         # evita sobreajuste
+    "min_samples_split": 5,  # mínimo 5 datos por división
+    "random_state": 42       # es reproducible
+}
+
+# Gradient boosting sobre histogramas: entrena sobre features discretizadas
+# (máx. 255 bins) y trata Terminal/Franja/Día como categorías nativas
+HIPERPARAMETROS_HIST = {
+    "max_iter": 200,
+    "learning_rate": 0.1,
+    "max_leaf_nodes": 31,
+    "random_state": 42
+}
+
+HIPERPARAMETROS_LINEAL = {
+    "colapso": {"class_weight": "balanced", "max_iter": 1000, "random_state": 42}
+}
+
+# Hiperparámetros elegidos por la búsqueda (busqueda_mio.py); si existe el archivo,
+# reemplazan a los de arriba para su backend
+ARCHIVO_CONFIG_MODELO = "config_modelo.json"
+
+
+def cargar_config_modelo(archivo=ARCHIVO_CONFIG_MODELO):
+    """Configuración {"backend", "ocupacion", "colapso"} guardada por la búsqueda, o None"""
+    if not archivo or not os.path.exists(archivo):
+        return None
+    with open(archivo, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def limitar_hilos(n_jobs):
+    """
+    Limita los hilos OpenMP del hilo actual (hist_gb no acepta n_jobs y usa todos los
+    núcleos). None o -1: sin límite. Envuelve fit y predict de cualquier backend.
+    """
+    if n_jobs is None or n_jobs < 1:
+        return nullcontext()
+    return threadpool_limits(limits=n_jobs, user_api="openmp")
+
+
+def crear_estimador(backend, hiperparametros, tarea, n_jobs=None):
+    """
+    Estimador sin entrenar del backend para la tarea "ocupacion" (regresión) o "colapso"
+    (clasificación). hist_gb ignora n_jobs: su fit/predict va dentro de limitar_hilos(n_jobs).
+    """
+    if backend == "random_forest":
+        clase = RandomForestRegressor if tarea == "ocupacion" else RandomForestClassifier
+        return clase(**hiperparametros[tarea], n_jobs=n_jobs or -1)
+    if backend == "hist_gb":
+        clase = HistGradientBoostingRegressor if tarea == "ocupacion" else HistGradientBoostingClassifier
+        return clase(**hiperparametros[tarea], categorical_features=INDICES_CATEGORICAS)
+    if tarea == "ocupacion":
+        return LinearRegression() #nota este es por si llega a ver errores con el randomforest anque es menos pontente que este
+    return LogisticRegression(**hiperparametros[tarea])
+
+
+# ===========================================================
+# CODIFICADOR CATEGÓRICO VECTORIZADO
+# ===========================================================
+class CodificadorCategorico:
+    """
+    Reemplazo vectorizado de LabelEncoder: mismas clases ordenadas y mismos códigos,
+    pero codifica la columna completa de una vez. Las categorías no vistas al
+    entrenar reciben el código reservado -1.
+    """
+
+    CODIGO_DESCONOCIDO = -1
+
+    def fit(self, serie):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.remove_unused_categories().cat.categories
         else:
-            print("No se pudo generar el DataFrame de data limpia.")
+            valores = pd.unique(serie.dropna())
+        self.classes_ = np.array(sorted(str(v) for v in valores), dtype=object)
+        return self
+
+    def transform(self, serie):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Solo se traducen las categorías (pocas), no cada fila
+            serie = serie.cat.rename_categories(lambda c: str(c))
+        else:
+            serie = serie.astype(str)
+        codigos = pd.Categorical(serie, categories=self.classes_).codes
+        return codigos.astype(np.int32)
+
+    def fit_transform(self, serie):
+        return self.fit(serie).transform(serie)
 
-    except Exception as e:
-        print("Error generando la data limpia:", e)
 
-df_limpio = pd.read_excel("data_limpia_mio.xlsx")
 class ModeloPredictivoMIO_sklearn:
 
-    def __init__(self, usar_ultimo_mes=False, usar_random_forest=True):
+    @instrumentar("modelo_predictivo.cargar_datos", filas=_filas_historia)
+    def __init__(self, usar_ultimo_mes=False, usar_random_forest=True,
+                 fecha_desde=None, fecha_hasta=None, terminales=None, nucleos=1,
+                 backend=None, archivo_config=ARCHIVO_CONFIG_MODELO, cargar_datos=True,
+                 usar_flota=False, bajo_consumo=False, presupuesto_memoria_mb=None):
+
+        # bajo_consumo: sin copias intermedias y con tipos reducidos (float32/int16/int8).
+        # presupuesto_memoria_mb: antes de cada etapa grande se estima la memoria
+        # necesaria y, si no cabe, se lanza MemoryError en vez de llegar a usar swap
+        self.bajo_consumo = bajo_consumo
+        self.presupuesto_memoria_mb = presupuesto_memoria_mb
 
         if usar_ultimo_mes:
-            fecha_max = pd.to_datetime(df_limpio["Fecha"]).max()
-            fecha_min = fecha_max - pd.Timedelta(days=30)
-            self.df = df_limpio[df_limpio["Fecha"] >= fecha_min].copy()
+            fecha_desde = fecha_maxima() - pd.Timedelta(days=30)
+
+        # Solo se leen del almacén las columnas y el rango de fechas necesarios;
+        # sin cargar_datos el modelo solo sirve para cargar artefactos y predecir
+        if cargar_datos:
+            if presupuesto_memoria_mb is not None:
+                self._verificar_memoria("cargar los datos", "carga", contar_filas(
+                    fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, terminales=terminales
+                ))
+            self.df = cargar_datos_limpios(
+                columnas=COLUMNAS_MODELO,
+                fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta,
+                terminales=terminales,
+                bajo_consumo=bajo_consumo
+            )
         else:
-            self.df = df_limpio.copy()
-
-        self.usar_random_forest = usar_random_forest
-        self._preparar_datos()
+            self.df = pd.DataFrame(columns=COLUMNAS_MODELO)
+
+        # backend: "random_forest", "hist_gb" o "lineal"; si no se indica se deduce
+        # de usar_random_forest (compatibilidad con el uso anterior)
+        if backend is None:
+            backend = "random_forest" if usar_random_forest else "lineal"
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido '{backend}'. Opciones: {', '.join(BACKENDS)}")
+
+        self.backend = backend
+        self.usar_random_forest = backend == "random_forest"
+
+        # Presupuesto de núcleos para entrenar (None = todos); no forma parte de la
+        # huella del modelo porque no cambia el resultado
+        self.nucleos = nucleos
+        self.tiempos_entrenamiento = {}
+
+        base = {"random_forest": HIPERPARAMETROS_BOSQUE, "hist_gb": HIPERPARAMETROS_HIST, "lineal": {}}[backend]
+        self.hiperparametros = {
+            "backend": backend,
+            "ocupacion": dict(base),
+            "colapso": dict(base, class_weight="balanced") if backend != "lineal"
+                       else dict(HIPERPARAMETROS_LINEAL["colapso"]),
+        }
+
+        # Configuración ajustada (forma parte de la versión del modelo a través de hiperparametros)
+        config = cargar_config_modelo(archivo_config)
+        if config is not None and config.get("backend") == backend:
+            for tarea in ("ocupacion", "colapso"):
+                self.hiperparametros[tarea].update(config.get(tarea, {}))
+        self.metricas = {}
+        self.df = self._preparar_datos(self.df)
 
         # Modelos y escaladores
         self.modelo_ocupacion = None
@@ -51,252 +273,737 @@ class ModeloPredictivoMIO_sklearn:
         self.label_encoders = {}
         self.df_predicciones = None
 
+        # Caché de capacidades medianas por (Terminal, Franja Horaria)
+        self._capacidad_mediana = None
+
+        # Huella de datos + hiperparámetros (se calcula al pedirla)
+        self._version = None
+
+        # Matriz de features y partición train/test compartidas por ambos modelos
+        self._entrenamiento = None
+
+        # Último día incluido en el entrenamiento (punto de partida de las actualizaciones)
+        self.fecha_entrenada = None
+
+        # Caché persistente de predicciones (se abre al primer uso)
+        self._cache_predicciones = None
+
+        # Flota de modelos por terminal (flota_mio): si está cargada, predecir
+        # reparte cada escenario al modelo de su terminal
+        self.flota = None
+        if usar_flota:
+            from flota_mio import FlotaModelos
+            self.flota = FlotaModelos.cargar()
+
 
 
     # ===========================================================
     # PREPARAR DATOS
     # ===========================================================
-    def _preparar_datos(self):
+    def _verificar_memoria(self, etapa, tipo, filas):
+        """MemoryError temprano si la etapa no cabe en presupuesto_memoria_mb"""
+        if self.presupuesto_memoria_mb is None:
+            return
+        en_uso = rss_mb() or 0.0
+        necesaria = filas * BYTES_POR_FILA[tipo][self.bajo_consumo] / 2**20
+        if en_uso + necesaria > self.presupuesto_memoria_mb:
+            raise MemoryError(
+                f"Memoria insuficiente para {etapa} ({filas:,} filas): se estiman "
+                f"{en_uso + necesaria:,.0f} MB ({en_uso:,.0f} MB ya en uso + {necesaria:,.0f} MB) "
+                f"y el presupuesto es {self.presupuesto_memoria_mb:,.0f} MB. Reduzca el rango de "
+                f"datos (usar_ultimo_mes, fecha_desde/fecha_hasta, terminales)"
+                + ("" if self.bajo_consumo else ", active bajo_consumo=True")
+                + " o aumente presupuesto_memoria_mb."
+            )
 
-        columnas = [
-            "Terminal", "Fecha", "Franja Horaria", "Día de la Semana",
-            "Capacidad Máxima", "Personas Actuales", "Estado"
-        ]
+    def _preparar_datos(self, df):
+
+        if self.bajo_consumo:
+            return self._preparar_datos_compacto(df)
 
-        self.df = self.df.dropna(subset=columnas)
+        df = df.dropna(subset=COLUMNAS_MODELO)
 
-        self.df["Fecha"] = pd.to_datetime(self.df["Fecha"], errors="coerce")
-        self.df["Capacidad Máxima"] = pd.to_numeric(self.df["Capacidad Máxima"], errors="coerce")
-        self.df["Personas Actuales"] = pd.to_numeric(self.df["Personas Actuales"], errors="coerce")
+        df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
+        df["Capacidad Máxima"] = pd.to_numeric(df["Capacidad Máxima"], errors="coerce")
+        df["Personas Actuales"] = pd.to_numeric(df["Personas Actuales"], errors="coerce")
 
-        self.df = self.df[self.df["Franja Horaria"] != "Desconocida"]
+        df = df[df["Franja Horaria"] != FRANJA_DESCONOCIDA]
 
         # Calcular ocupación
-        self.df["Ocupacion"] = np.where(
-            self.df["Capacidad Máxima"] > 0,
-            self.df["Personas Actuales"] / self.df["Capacidad Máxima"],
+        df["Ocupacion"] = np.where(
+            df["Capacidad Máxima"] > 0,
+            df["Personas Actuales"] / df["Capacidad Máxima"],
             np.nan
         )
 
-        self.df = self.df.dropna(subset=["Ocupacion"])
+        df = df.dropna(subset=["Ocupacion"])
+
+        df["Colapsada"] = (df["Ocupacion"] > 0.95).astype(int)
 
-        self.df["Colapsada"] = (self.df["Ocupacion"] > 0.95).astype(int)
+        # Unificar nombres de días (categórico)
+        df["Día de la Semana"] = dias_semana(df["Fecha"])
 
-        # Unificar nombres de días
-        self.df["Día de la Semana"] = pd.to_datetime(self.df["Fecha"]).dt.day_name()
+        return df
+
+    def _preparar_datos_compacto(self, df):
+        """
+        Mismo resultado que _preparar_datos, pero las filas se seleccionan una sola vez
+        (una máscara con todas las condiciones), las columnas se añaden sobre el mismo
+        DataFrame y los números usan tipos reducidos.
+        """
+        # Las columnas que ya llegan con su tipo (almacén limpio) no se convierten
+        if not pd.api.types.is_datetime64_any_dtype(df["Fecha"]):
+            df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
+        for col in ("Capacidad Máxima", "Personas Actuales"):
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+
+        validas = (
+            df[COLUMNAS_MODELO].notna().all(axis=1)
+            & (df["Franja Horaria"] != FRANJA_DESCONOCIDA)
+            & (df["Capacidad Máxima"] > 0)
+        ).to_numpy()
+
+        # Ocupación y colapso con la precisión completa; después se reducen los tipos
+        # (antes de seleccionar filas, para que la única copia sea de columnas pequeñas)
+        ocupacion = df["Personas Actuales"].to_numpy(np.float64) / df["Capacidad Máxima"].to_numpy(np.float64)
+        df["Ocupacion"] = ocupacion.astype(np.float32)
+        df["Colapsada"] = (ocupacion > 0.95).astype(np.int8)
+        del ocupacion
+        for col in ("Capacidad Máxima", "Personas Actuales"):
+            df[col] = _reducir_numerico(df[col])
+
+        if not validas.all():
+            df = df[validas]
+            # Sin las filas nulas, los conteos suelen caber en int16
+            df["Personas Actuales"] = _reducir_numerico(df["Personas Actuales"])
+
+        df["Día de la Semana"] = dias_semana(df["Fecha"])
+        return df
 
 
 
     # ===========================================================
     # ENCODING DE VARIABLES
     # ===========================================================
-    def _preparar_features(self, df, entrenar=True):
+    @instrumentar()
+    def _preparar_features(self, df, entrenar=True, orden=None):
+        """
+        Matriz float32 contigua con las columnas de COLUMNAS_COLAPSO, sin copiar el DataFrame.
+        La última columna (Ocupacion) queda reservada para quien la rellene; el modelo
+        de ocupación usa solo las primeras columnas (una vista, sin copia).
+        Con orden, las filas de la matriz salen ya en ese orden (columna a columna).
+        """
+        filas = slice(None) if orden is None else orden
+        X = np.empty((len(df) if orden is None else len(orden), len(COLUMNAS_COLAPSO)), dtype=np.float32)
+        X[:, 0] = df["Capacidad Máxima"].to_numpy()[filas]
+
+        for j, col in enumerate(CATEGORICAS, start=1):
+            if entrenar:
+                self.label_encoders[col] = CodificadorCategorico().fit(df[col])
+            # Columnas completas de una vez; lo no visto al entrenar queda en -1
+            X[:, j] = self.label_encoders[col].transform(df[col])[filas]
+
+        return X
+
+    def _datos_entrenamiento(self):
+        """Features, objetivos y partición train/test, construidos una sola vez por versión de datos"""
+        version = self.version_modelo()
+
+        if self._entrenamiento is None or self._entrenamiento["version"] != version:
+            self._verificar_memoria("preparar las features de entrenamiento", "features", len(self.df))
+            y_colapso = self.df["Colapsada"].to_numpy()
+
+            # Una sola partición (estratificada por colapso) para los dos modelos
+            idx_train, idx_test = train_test_split(
+                np.arange(len(self.df), dtype=np.int32 if self.bajo_consumo else np.int64),
+                test_size=0.2, random_state=42, stratify=y_colapso
+            )
 
-        df_features = df.copy()
-        categoricas = ['Terminal', 'Franja Horaria', 'Día de la Semana']
+            # La matriz se arma ya ordenada (entrenamiento y luego prueba): X_train y
+            # X_test son vistas de una sola matriz, sin las dos copias de X[idx]
+            orden = np.concatenate([idx_train, idx_test])
+            X = self._preparar_features(self.df, entrenar=True, orden=orden)
+            X[:, -1] = self.df["Ocupacion"].to_numpy()[orden]
+            del orden
 
-        if entrenar:
-            for col in categoricas:
-                le = LabelEncoder()
-                df_features[f'{col}_encoded'] = le.fit_transform(df_features[col].astype(str))
-                self.label_encoders[col] = le
-        else:
-            for col in categoricas:
-                le = self.label_encoders[col]
-                df_features[f'{col}_encoded'] = df_features[col].astype(str).apply(
-                    lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                )
+            self._entrenamiento = {
+                "version": version,
+                "X_train": X[:len(idx_train)],
+                "X_test": X[len(idx_train):],
+                "y_ocupacion": self.df["Ocupacion"].to_numpy(),
+                "y_colapso": y_colapso,
+                "idx_train": idx_train,
+                "idx_test": idx_test,
+            }
+            self.columnas_colapso = list(COLUMNAS_COLAPSO)
+            self.fecha_entrenada = self.df["Fecha"].max()
 
-        features_numericas = ['Capacidad Máxima'] + [f'{col}_encoded' for col in categoricas]
-        return df_features[features_numericas]
+        return self._entrenamiento
+
+    def _escalar(self, scaler, X, ajustar=False):
+        """Estandariza para bosques y modelos lineales; hist_gb usa la matriz tal cual"""
+        # scaler None: bosque compacto, que ya incluye su propio escalado
+        if self.backend == "hist_gb" or scaler is None:
+            return X
+        return scaler.fit_transform(X) if ajustar else scaler.transform(X)
 
 
 
     # ===========================================================
     # MODELO DE OCUPACIÓN
     # ===========================================================
-    def entrenar_modelo_ocupacion(self):
+    @instrumentar(filas=_filas_historia)
+    def entrenar_modelo_ocupacion(self, n_jobs=None):
 
-        X = self._preparar_features(self.df, entrenar=True)
-        y = self.df["Ocupacion"].values
+        inicio = time.perf_counter()
+        datos = self._datos_entrenamiento()
+        n = len(COLUMNAS_FEATURES)
+        y_train = datos["y_ocupacion"][datos["idx_train"]]
+        y_test = datos["y_ocupacion"][datos["idx_test"]]
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        X_train_scaled = self._escalar(self.scaler_ocupacion, datos["X_train"][:, :n], ajustar=True)
+        X_test_scaled = self._escalar(self.scaler_ocupacion, datos["X_test"][:, :n])
 
-        X_train_scaled = self.scaler_ocupacion.fit_transform(X_train)
-        X_test_scaled = self.scaler_ocupacion.transform(X_test)
+        n_jobs = n_jobs or self.nucleos
+        self.modelo_ocupacion = crear_estimador(self.backend, self.hiperparametros, "ocupacion", n_jobs=n_jobs)
 
-        if self.usar_random_forest:
-            self.modelo_ocupacion = RandomForestRegressor(
-                n_estimators=100, #numeros de arboles
-                max_depth=20,  #evita sobreajuste
-                min_samples_split=5, #mínimo 5 datos por división
-                random_state=42 # es reproducible
-            )
-        else:
-            self.modelo_ocupacion = LinearRegression() #nota este es por si llega a ver errores con el randomforest anque es menos pontente que este
-
-        self.modelo_ocupacion.fit(X_train_scaled, y_train)
-        y_test_pred = self.modelo_ocupacion.predict(X_test_scaled)
+        with limitar_hilos(n_jobs):
+            self.modelo_ocupacion.fit(X_train_scaled, y_train)
+            y_test_pred = self.modelo_ocupacion.predict(X_test_scaled)
 
         r2 = r2_score(y_test, y_test_pred)
-        print(f"Modelo de ocupación entrenado correctamente (R² = {r2:.3f})")
+        self.metricas["r2_ocupacion"] = r2
+        self.tiempos_entrenamiento["ocupacion"] = time.perf_counter() - inicio
+        print(f"Modelo de ocupación entrenado correctamente (R² = {r2:.3f}, "
+              f"{self.tiempos_entrenamiento['ocupacion']:.2f} s)")
 
 
 
     # ===========================================================
     # MODELO DE COLAPSO
     # ===========================================================
-    def entrenar_modelo_colapso(self):
+    @instrumentar(filas=_filas_historia)
+    def entrenar_modelo_colapso(self, n_jobs=None):
 
-        X = self._preparar_features(self.df, entrenar=True)
-        X["Ocupacion"] = self.df["Ocupacion"].values
-        y = self.df["Colapsada"].values
+        inicio = time.perf_counter()
+        datos = self._datos_entrenamiento()
+        y_train = datos["y_colapso"][datos["idx_train"]]
+        y_test = datos["y_colapso"][datos["idx_test"]]
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        X_train_scaled = self._escalar(self.scaler_colapso, datos["X_train"], ajustar=True)
+        X_test_scaled = self._escalar(self.scaler_colapso, datos["X_test"])
 
-        X_train_scaled = self.scaler_colapso.fit_transform(X_train)
-        X_test_scaled = self.scaler_colapso.transform(X_test)
+        n_jobs = n_jobs or self.nucleos
+        self.modelo_colapso = crear_estimador(self.backend, self.hiperparametros, "colapso", n_jobs=n_jobs)
 
-        if self.usar_random_forest:
-            self.modelo_colapso = RandomForestClassifier(
-                n_estimators=100, #numeros de arboles
-                max_depth=20,
-                min_samples_split=5,#mínimo 5 datos por división
-                class_weight='balanced',
-                random_state=42
-            )
+        with limitar_hilos(n_jobs):
+            self.modelo_colapso.fit(X_train_scaled, y_train)
+            y_test_pred = self.modelo_colapso.predict(X_test_scaled)
+        reporte = classification_report(y_test, y_test_pred, target_names=["Estable", "Colapsada"])
+        self.metricas["f1_colapso"] = f1_score(y_test, y_test_pred, zero_division=0)
+        self.tiempos_entrenamiento["colapso"] = time.perf_counter() - inicio
+
+        print(f"Modelo de colapso entrenado correctamente ({self.tiempos_entrenamiento['colapso']:.2f} s)")
+        print(reporte)
+
+
+
+    # ===========================================================
+    # ⚡ ENTRENAMIENTO CONCURRENTE DE AMBOS MODELOS
+    # ===========================================================
+    @instrumentar(filas=_filas_historia)
+    def entrenar_modelos(self, paralelo=True, nucleos=None):
+        """
+        Entrena ocupación y colapso. En paralelo, ambos modelos se entrenan a la vez
+        (hilos: la construcción de árboles libera el GIL) y el presupuesto de núcleos
+        se reparte entre los dos para no sobresuscribir la CPU.
+        """
+        nucleos = nucleos or self.nucleos or os.cpu_count() or 1
+        inicio = time.perf_counter()
+
+        if not paralelo or nucleos < 2:
+            self.entrenar_modelo_ocupacion(n_jobs=nucleos)
+            self.entrenar_modelo_colapso(n_jobs=nucleos)
         else:
-            self.modelo_colapso = LogisticRegression(
-                class_weight='balanced',
-                max_iter=1000, #max_iter=1000
-                random_state=42
+            # Features y partición se construyen antes, una sola vez, fuera de los hilos
+            self._datos_entrenamiento()
+            nucleos_ocupacion = (nucleos + 1) // 2
+            with ThreadPoolExecutor(max_workers=2) as ejecutor:
+                tareas = [
+                    ejecutor.submit(self.entrenar_modelo_ocupacion, nucleos_ocupacion),
+                    ejecutor.submit(self.entrenar_modelo_colapso, nucleos - nucleos_ocupacion),
+                ]
+                for tarea in tareas:
+                    tarea.result()
+
+        self.tiempos_entrenamiento["total"] = time.perf_counter() - inicio
+        print("Tiempos de entrenamiento (s): " + ", ".join(
+            f"{nombre} = {segundos:.2f}" for nombre, segundos in self.tiempos_entrenamiento.items()
+        ))
+        return self.tiempos_entrenamiento
+
+
+
+    # ===========================================================
+    # 🌙 ACTUALIZACIÓN INCREMENTAL (SOLO LOS DÍAS NUEVOS)
+    # ===========================================================
+    @instrumentar()
+    def actualizar_incremental(self, df_nuevo=None, arboles_por_dia=10, ventana_arboles=None):
+        """
+        Añade a los modelos ya entrenados solo los registros posteriores a fecha_entrenada,
+        sin reentrenar sobre la historia completa (coste proporcional a los días nuevos).
+
+        - random_forest: se entrenan arboles_por_dia árboles nuevos (warm_start) sobre los
+          datos nuevos y se retiran los más antiguos para mantener una ventana de
+          ventana_arboles (por defecto, los árboles que ya tiene cada modelo).
+        - hist_gb: no soportado. Cada fit, también con warm_start, rehace el codificador
+          de categorías y los bins con los datos nuevos, y las iteraciones existentes
+          pasarían a leer otros códigos; requiere reentrenar.
+        - lineal: no soportado; requiere reentrenar.
+
+        Los escaladores y codificadores no se reajustan. Devuelve True si hubo actualización.
+        """
+        if self.modelo_ocupacion is None or self.fecha_entrenada is None:
+            print("⚠️ No hay modelo entrenado que actualizar.")
+            return False
+
+        if self.backend not in BACKENDS_INCREMENTALES:
+            print(f"⚠️ El backend {self.backend} no admite actualización incremental; reentrene el modelo.")
+            return False
+
+        if isinstance(self.modelo_ocupacion, BosqueCompacto):
+            print("⚠️ Un modelo compacto no se puede actualizar; actualice el modelo completo y reexporte.")
+            return False
+
+        if df_nuevo is None:
+            df_nuevo = cargar_datos_limpios(
+                columnas=COLUMNAS_MODELO,
+                fecha_desde=self.fecha_entrenada + pd.Timedelta(days=1)
             )
+        df_nuevo = self._preparar_datos(df_nuevo)
+        df_nuevo = df_nuevo[df_nuevo["Fecha"] > self.fecha_entrenada]
 
-        self.modelo_colapso.fit(X_train_scaled, y_train)
-        self.columnas_colapso = list(X.columns)
+        if df_nuevo.empty:
+            print("No hay registros nuevos desde la última actualización.")
+            return False
 
-        y_test_pred = self.modelo_colapso.predict(X_test_scaled)
-        reporte = classification_report(y_test, y_test_pred, target_names=["Estable", "Colapsada"])
+        X = self._preparar_features(df_nuevo, entrenar=False)
+        X[:, -1] = df_nuevo["Ocupacion"].to_numpy()
+        y_colapso = df_nuevo["Colapsada"].to_numpy()
+        n = len(COLUMNAS_FEATURES)
 
-        print("Modelo de colapso entrenado correctamente")
-        print(reporte)
+        modelos = [(self.modelo_ocupacion, self._escalar(self.scaler_ocupacion, X[:, :n]),
+                    df_nuevo["Ocupacion"].to_numpy())]
+
+        # Con una sola clase el clasificador no puede ampliarse sin perder la otra
+        if len(np.unique(y_colapso)) == 2:
+            modelos.append((self.modelo_colapso, self._escalar(self.scaler_colapso, X), y_colapso))
+        else:
+            print("El modelo de colapso no se actualiza: los datos nuevos tienen una sola clase.")
+
+        for modelo, X_modelo, y in modelos:
+            # El tamaño de cada bosque antes de ampliarlo (el modelo puede venir de un archivo)
+            ventana = ventana_arboles or len(modelo.estimators_)
+            modelo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + arboles_por_dia)
+            with warnings.catch_warnings():
+                # class_weight="balanced" con warm_start solo emite una advertencia
+                warnings.simplefilter("ignore", UserWarning)
+                modelo.fit(X_modelo, y)
+            # Se retiran los árboles más antiguos (ventana móvil)
+            modelo.estimators_ = modelo.estimators_[-ventana:]
+            modelo.n_estimators = len(modelo.estimators_)
+
+        # Historia en memoria y versión: la nueva versión encadena la anterior con los datos nuevos
+        version_anterior = self.version_modelo()
+        self.df = pd.concat([self.df[self.df["Fecha"] <= self.fecha_entrenada], df_nuevo])
+        self.fecha_entrenada = df_nuevo["Fecha"].max()
+        self._capacidad_mediana = None
+        self._entrenamiento = None
+
+        huella = hashlib.sha256(version_anterior.encode("utf-8"))
+        huella.update(_hash_datos(df_nuevo))
+        self._version = huella.hexdigest()[:16]
+
+        print(f"Modelo actualizado con {len(df_nuevo)} registros nuevos "
+              f"(hasta {self.fecha_entrenada.date()}, versión {self._version}).")
+        return True
 
 
 
     # ===========================================================
     #  GENERAR FECHAS FUTURAS
     # ===========================================================
-    def generar_fechas_futuras(self, dias_futuros=5):
-
-        fecha_max = self.df["Fecha"].max()
+    def _capacidades_medianas(self):
+        """Mediana de capacidad por (Terminal, Franja), calculada una sola vez con un groupby"""
+        if self._capacidad_mediana is None:
+            self._capacidad_mediana = (
+                self.df.groupby(["Terminal", "Franja Horaria"], observed=True)["Capacidad Máxima"]
+                .median()
+            )
+            # Respaldo para combinaciones sin historia
+            self._capacidad_global = self.df["Capacidad Máxima"].median()
+        return self._capacidad_mediana
 
+    def _combinaciones_futuras(self, dias_futuros):
+        """Fechas futuras, terminales y franjas conocidas que forman la rejilla de escenarios"""
         fechas_futuras = pd.date_range(
-            start=fecha_max + timedelta(days=1),
+            start=self.df["Fecha"].max() + timedelta(days=1),
             periods=dias_futuros,
             freq="D"
         )
 
         terminales = self.df["Terminal"].unique()
-        franjas = [f for f in self.df["Franja Horaria"].unique() if f != "Desconocida"]
+        franjas = self.df["Franja Horaria"].unique()
+        franjas = franjas[franjas != FRANJA_DESCONOCIDA]
+        return fechas_futuras, terminales, franjas
+
+    @instrumentar()
+    def generar_fechas_futuras(self, dias_futuros=5):
 
-        escenarios = []
+        fechas_futuras, terminales, franjas = self._combinaciones_futuras(dias_futuros)
 
         print(f"Generando escenarios futuros ({len(terminales)} terminales × {len(franjas)} franjas × {len(fechas_futuras)} días)...")
 
-        for fecha in fechas_futuras:
-            dia_semana = fecha.day_name()
-            for terminal in terminales:
-                for franja in franjas:
-                    hist = self.df[
-                        (self.df["Terminal"] == terminal) &
-                        (self.df["Franja Horaria"] == franja)
-                    ]
-
-                    cap = hist["Capacidad Máxima"].median() if len(hist) > 0 else self.df["Capacidad Máxima"].median()
-
-                    escenarios.append({
-                        "Terminal": terminal,
-                        "Fecha": fecha,
-                        "Día de la Semana": dia_semana,
-                        "Franja Horaria": franja,
-                        "Capacidad Máxima": cap
-                    })
-
-        df_futuro = pd.DataFrame(escenarios)
+        df_futuro = self._escenarios(fechas_futuras, terminales, franjas)
         print(f"Escenarios generados: {len(df_futuro)} registros.")
         return df_futuro
 
+    def _escenarios(self, fechas_futuras, terminales, franjas):
+
+        # Producto cartesiano fecha × terminal × franja (mismo orden que los bucles anidados)
+        df_futuro = pd.MultiIndex.from_product(
+            [fechas_futuras, terminales, franjas],
+            names=["Fecha", "Terminal", "Franja Horaria"]
+        ).to_frame(index=False)
+
+        return self.completar_escenarios(df_futuro)
+
+    def completar_escenarios(self, df_consultas):
+        """
+        A partir de columnas Terminal, Franja Horaria y Fecha arma los escenarios completos:
+        día de la semana y capacidad mediana histórica (o la global si no hay historia).
+        """
+        fechas = pd.to_datetime(df_consultas["Fecha"]).dt.normalize()
+        capacidades = self._capacidades_medianas().reindex(
+            pd.MultiIndex.from_arrays([df_consultas["Terminal"], df_consultas["Franja Horaria"]])
+        ).fillna(self._capacidad_global).to_numpy()
+
+        return aplicar_esquema(pd.DataFrame({
+            "Terminal": df_consultas["Terminal"].to_numpy(),
+            "Fecha": fechas.to_numpy(),
+            "Día de la Semana": dias_semana(fechas),
+            "Franja Horaria": df_consultas["Franja Horaria"].to_numpy(),
+            "Capacidad Máxima": capacidades
+        }))
+
+    def _hay_modelo(self):
+        return self.modelo_ocupacion is not None or self.flota is not None
+
+    def predecir_consultas(self, df_consultas):
+        """Predice escenarios arbitrarios (Terminal, Franja Horaria, Fecha) con el modelo en memoria"""
+        if not self._hay_modelo():
+            raise RuntimeError("No hay modelo de ocupación entrenado.")
+        return self._predecir_lote(self.completar_escenarios(df_consultas))
+
 
 
     # ===========================================================
     # 🔮 PREDICCIÓN COMPLETA
     # ===========================================================
-    def predecir(self, incluir_futuro=True, dias_futuros=5):
-
-        if self.modelo_ocupacion is None:
+    @instrumentar()
+    def predecir(self, incluir_futuro=True, dias_futuros=5, usar_cache=False):
+        """
+        Con usar_cache solo se predicen los escenarios que esta versión del modelo
+        no haya predicho antes (ver cache_predicciones_mio). Es opcional: las
+        mediciones de tiempo deben predecir siempre.
+        """
+
+        if not self._hay_modelo():
             print("⚠️ No hay modelo de ocupación entrenado.")
             return None
 
-        df = self.df.copy()
-
         if incluir_futuro:
             df = self.generar_fechas_futuras(dias_futuros)
+        else:
+            # Copia superficial: las columnas de predicción se añaden sin tocar self.df
+            df = self.df.copy(deep=False)
 
-        # Predicción de ocupación
-        X = self._preparar_features(df, entrenar=False)
-        X_scaled = self.scaler_ocupacion.transform(X)
+        self.df_predicciones = self._predecir_lote(df, usar_cache=usar_cache)
+        print("Predicciones generadas correctamente")
+        return self.df_predicciones
+
+    def _predecir_matriz(self, X, n_jobs=None):
+        """
+        Ocupación y probabilidad de colapso (None sin modelo de colapso) de una matriz de
+        features, con como mucho n_jobs hilos (por defecto, self.nucleos)
+        """
+
+        if self.bajo_consumo and len(X) > FILAS_BLOQUE_BAJO_CONSUMO:
+            # Por bloques: las conversiones internas de sklearn (float64) no crecen con X
+            ocupacion_pred = np.empty(len(X))
+            prob_colapso = None if self.modelo_colapso is None else np.empty(len(X))
+            for inicio in range(0, len(X), FILAS_BLOQUE_BAJO_CONSUMO):
+                bloque = slice(inicio, inicio + FILAS_BLOQUE_BAJO_CONSUMO)
+                ocupacion_pred[bloque], prob = self._predecir_matriz(X[bloque], n_jobs)
+                if prob is not None:
+                    prob_colapso[bloque] = prob
+            return ocupacion_pred, prob_colapso
+
+        with limitar_hilos(n_jobs or self.nucleos):
+            # Predicción de ocupación (primeras columnas de la matriz, sin copiarla)
+            X_scaled = self._escalar(self.scaler_ocupacion, X[:, :len(COLUMNAS_FEATURES)])
+
+            ocupacion_pred = np.clip(
+                self.modelo_ocupacion.predict(X_scaled),
+                0.1,
+                2.0
+            )
 
-        ocupacion_pred = np.clip(
-            self.modelo_ocupacion.predict(X_scaled),
-            0.1,
-            2.0
-        )
+            if self.modelo_colapso is None:
+                return ocupacion_pred, None
 
-        df["Ocupacion"] = ocupacion_pred
-        df["Personas_Predichas"] = (df["Ocupacion"] * df["Capacidad Máxima"]).round().astype(int)
+            # La misma matriz, con la ocupación predicha en su columna reservada
+            X[:, -1] = ocupacion_pred
+            X_colapso_scaled = self._escalar(self.scaler_colapso, X)
+            return ocupacion_pred, self.modelo_colapso.predict_proba(X_colapso_scaled)[:, 1]
 
-        # Predicción de colapso
-        if self.modelo_colapso is not None:
+    def cache_predicciones(self, archivo=ARCHIVO_CACHE_PREDICCIONES):
+        if self._cache_predicciones is None or self._cache_predicciones.archivo != archivo:
+            self._cache_predicciones = CachePredicciones(archivo)
+        return self._cache_predicciones
 
-            X_colapso = X.copy()
-            X_colapso["Ocupacion"] = ocupacion_pred
+    def _version_cache(self):
+        """Clave de la caché: versión del modelo y tipo de evaluador (compacto o de scikit-learn)"""
+        evaluador = "compacto" if isinstance(self.modelo_ocupacion, BosqueCompacto) else self.backend
+        return f"{self.version_modelo()}-{evaluador}"
 
-            columnas_entrenamiento = getattr(self, "columnas_colapso", X_colapso.columns)
-            X_colapso = X_colapso[columnas_entrenamiento]
+    def _predecir_lote(self, df, usar_cache=False, n_jobs=None):
+        """Añade al DataFrame de escenarios la ocupación, personas y colapso previstos"""
+        self._verificar_memoria("predecir", "prediccion", len(df))
 
-            X_colapso_scaled = self.scaler_colapso.transform(X_colapso)
-            prob_colapso = self.modelo_colapso.predict_proba(X_colapso_scaled)[:, 1]
+        if self.flota is not None:
+            # Cada terminal con su modelo; las que no están en la flota, con el modelo global
+            ocupacion_pred, prob_colapso = self.flota.predecir(
+                df, respaldo=self if self.modelo_ocupacion is not None else None, n_jobs=n_jobs or self.nucleos
+            )
+        elif usar_cache and self.modelo_colapso is not None:
+            # Solo los escenarios que esta versión del modelo aún no ha predicho llegan a los modelos
+            X = self._preparar_features(df, entrenar=False)
+            ocupacion_pred, prob_colapso = self.cache_predicciones().predecir(
+                X[:, :len(COLUMNAS_FEATURES)], self._version_cache(),
+                lambda X_faltantes: self._predecir_matriz(
+                    np.hstack([X_faltantes, np.zeros((len(X_faltantes), 1), dtype=np.float32)]), n_jobs
+                )
+            )
+        else:
+            ocupacion_pred, prob_colapso = self._predecir_matriz(self._preparar_features(df, entrenar=False), n_jobs)
+
+        personas = np.round(ocupacion_pred * df["Capacidad Máxima"].to_numpy(np.float64))
+        if self.bajo_consumo:
+            ocupacion_pred = ocupacion_pred.astype(np.float32)
+            personas = _reducir_numerico(pd.Series(personas))
+            prob_colapso = None if prob_colapso is None else prob_colapso.astype(np.float32)
+
+        df["Ocupacion"] = ocupacion_pred
+        df["Personas_Predichas"] = personas if self.bajo_consumo else personas.astype(int)
 
+        # Predicción de colapso
+        if prob_colapso is not None:
             df["Prob_Colapso"] = prob_colapso
-            df["Estado_Previsto"] = np.select(
-                [df["Prob_Colapso"] > 0.75],
-                ["Colapsará"],
-                default="Estable"
+            df["Estado_Previsto"] = pd.Categorical.from_codes(
+                (prob_colapso > UMBRAL_COLAPSO).astype(np.int8),  # 1 = "Colapsará"
+                dtype=TIPO_ESTADO_PREVISTO
             )
 
-        self.df_predicciones = df
-        print("Predicciones generadas correctamente")
         return df
 
 
 
+    # ===========================================================
+    # 🌊 PREDICCIÓN POR LOTES CON SALIDA EN STREAMING
+    # ===========================================================
+    def _lotes_de_escenarios(self, dias_futuros, tamano_lote):
+        """Genera la rejilla de escenarios por tramos de días, sin materializarla completa"""
+        fechas_futuras, terminales, franjas = self._combinaciones_futuras(dias_futuros)
+        dias_por_lote = max(1, tamano_lote // max(1, len(terminales) * len(franjas)))
+
+        for inicio in range(0, len(fechas_futuras), dias_por_lote):
+            yield self._escenarios(fechas_futuras[inicio:inicio + dias_por_lote], terminales, franjas)
+
+    @instrumentar(filas=lambda resultado, *args, **kwargs: resultado and resultado["filas"])
+    def predecir_por_lotes(self, dias_futuros=365, tamano_lote=100_000,
+                           ruta=RUTA_PREDICCIONES, hilos=None):
+        """
+        Predice los escenarios futuros por lotes de ~tamano_lote filas y escribe cada lote
+        directamente en el almacén de predicciones (Parquet por mes), sin guardar el
+        resultado en memoria. Con hilos, varios lotes se predicen a la vez, pero nunca
+        hay más de `hilos` lotes pendientes. Devuelve filas, segundos y filas por segundo.
+        """
+        if not self._hay_modelo():
+            print("⚠️ No hay modelo de ocupación entrenado.")
+            return None
+
+        borrar_almacen(ruta)
+        inicio = time.perf_counter()
+        filas = 0
+        lotes = self._lotes_de_escenarios(dias_futuros, tamano_lote)
+
+        def escribir(parte, df_lote):
+            guardar_particionado(df_lote, ruta, parte=parte)
+            return len(df_lote)
+
+        if not hilos or hilos < 2:
+            for parte, df_lote in enumerate(lotes):
+                filas += escribir(parte, self._predecir_lote(df_lote))
+        else:
+            # Ventana acotada de lotes en vuelo; se escriben en orden en este hilo.
+            # Los núcleos se reparten entre los hilos (hist_gb usaría todos en cada uno)
+            nucleos_por_hilo = max(1, (self.nucleos or os.cpu_count() or 1) // hilos)
+            with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+                pendientes = deque()
+                for parte, df_lote in enumerate(lotes):
+                    pendientes.append((parte, ejecutor.submit(self._predecir_lote, df_lote, False, nucleos_por_hilo)))
+                    if len(pendientes) >= hilos:
+                        parte_lista, tarea = pendientes.popleft()
+                        filas += escribir(parte_lista, tarea.result())
+                while pendientes:
+                    parte_lista, tarea = pendientes.popleft()
+                    filas += escribir(parte_lista, tarea.result())
+
+        segundos = time.perf_counter() - inicio
+        resultado = {"filas": filas, "segundos": segundos, "filas_por_s": filas / max(segundos, 1e-9)}
+        print(f"Predicciones por lotes: {filas} filas en {segundos:.2f} s "
+              f"({resultado['filas_por_s']:.0f} filas/s) → '{ruta}'")
+        return resultado
+
+
+
+    # ===========================================================
+    # 📦 GUARDAR / CARGAR MODELO ENTRENADO
+    # ===========================================================
+    def guardar_modelo(self, archivo=ARCHIVO_MODELO):
+        """Guarda modelos, escaladores, codificadores y columnas de colapso en un solo archivo"""
+        artefactos = {nombre: getattr(self, nombre, None) for nombre in ARTEFACTOS_MODELO}
+        artefactos["version"] = self.version_modelo()
+        # Sin compresión para poder abrir los arreglos con mmap al cargar
+        joblib.dump(artefactos, archivo)
+        print(f"Modelo guardado correctamente: {archivo}")
+
+    @instrumentar()
+    def cargar_modelo(self, archivo=ARCHIVO_MODELO, mmap_mode=None):
+        artefactos = joblib.load(archivo, mmap_mode=mmap_mode)
+        self._version = artefactos.pop("version", None)
+        for nombre, valor in artefactos.items():
+            setattr(self, nombre, valor)
+        print(f"Modelo cargado correctamente: {archivo}")
+
+    def exportar_compacto(self, archivo=ARCHIVO_MODELO_COMPACTO, fusionar_hojas=True):
+        """
+        Compila ambos bosques (con sus escaladores) y los codificadores en arreglos planos
+        en un .npz comprimido. Verifica sobre una muestra de la historia que las salidas
+        coinciden con scikit-learn y devuelve la diferencia máxima encontrada.
+        """
+        if self.backend != "random_forest" or not hasattr(self.modelo_ocupacion, "estimators_"):
+            print("⚠️ Solo se pueden compactar modelos random_forest entrenados.")
+            return None
+
+        ocupacion = BosqueCompacto.desde_sklearn(self.modelo_ocupacion, self.scaler_ocupacion, fusionar_hojas)
+        colapso = BosqueCompacto.desde_sklearn(self.modelo_colapso, self.scaler_colapso, fusionar_hojas)
+
+        # Verificación contra scikit-learn
+        muestra = self.df.sample(min(len(self.df), 20_000), random_state=42)
+        X = self._preparar_features(muestra, entrenar=False)
+        X[:, -1] = muestra["Ocupacion"].to_numpy()
+        n = len(COLUMNAS_FEATURES)
+        diferencia = max(
+            np.abs(ocupacion.predict(X[:, :n]) - self.modelo_ocupacion.predict(self.scaler_ocupacion.transform(X[:, :n]))).max(),
+            np.abs(colapso.predict_proba(X) - self.modelo_colapso.predict_proba(self.scaler_colapso.transform(X))).max()
+        )
+
+        meta = {
+            "version": self.version_modelo(),
+            "categoricas": CATEGORICAS,
+            "fecha_entrenada": None if self.fecha_entrenada is None else str(self.fecha_entrenada),
+        }
+        np.savez_compressed(
+            archivo,
+            meta=np.array(json.dumps(meta)),
+            **ocupacion.a_arreglos("ocupacion"),
+            **colapso.a_arreglos("colapso"),
+            **{f"clases_{j}": np.array([str(c) for c in self.label_encoders[col].classes_], dtype=str)
+               for j, col in enumerate(CATEGORICAS)}
+        )
+        print(f"Modelo compacto guardado: {archivo} ({os.path.getsize(archivo) / 1e6:.2f} MB, "
+              f"diferencia máxima con scikit-learn = {diferencia:.3g})")
+        return diferencia
+
+    def cargar_compacto(self, archivo=ARCHIVO_MODELO_COMPACTO):
+        """Carga los bosques compactos; predecir() los usa igual que a los de scikit-learn"""
+        datos = np.load(archivo)
+        meta = json.loads(str(datos["meta"]))
+
+        self.backend = "random_forest"
+        self.modelo_ocupacion = BosqueCompacto.desde_arreglos(datos, "ocupacion")
+        self.modelo_colapso = BosqueCompacto.desde_arreglos(datos, "colapso")
+        # El escalado está dentro de cada bosque compacto
+        self.scaler_ocupacion = None
+        self.scaler_colapso = None
+
+        for j, col in enumerate(meta["categoricas"]):
+            codificador = CodificadorCategorico()
+            codificador.classes_ = datos[f"clases_{j}"].astype(object)
+            self.label_encoders[col] = codificador
+
+        self.columnas_colapso = list(COLUMNAS_COLAPSO)
+        self.fecha_entrenada = None if meta["fecha_entrenada"] is None else pd.Timestamp(meta["fecha_entrenada"])
+        self._version = meta["version"]
+        print(f"Modelo compacto cargado correctamente: {archivo}")
+
+    def version_modelo(self):
+        """Huella del contenido de los datos de entrenamiento y de los hiperparámetros"""
+        if self._version is None:
+            huella = hashlib.sha256()
+            huella.update(_hash_datos(self.df))
+            huella.update(json.dumps(self.hiperparametros, sort_keys=True).encode("utf-8"))
+            huella.update(str(FORMATO_ARTEFACTOS).encode("utf-8"))
+            self._version = huella.hexdigest()[:16]
+        return self._version
+
+    def cargar_o_entrenar(self, ruta=RUTA_CACHE_MODELOS):
+        """
+        Carga los artefactos de esta versión (mapeados en memoria) si ya existen;
+        si no, entrena ambos modelos y los guarda. Devuelve True si hubo que entrenar.
+        """
+        archivo = os.path.join(ruta, f"{self.version_modelo()}.joblib")
+
+        if os.path.exists(archivo):
+            self.cargar_modelo(archivo, mmap_mode="r")
+            return False
+
+        self.entrenar_modelos()
+        os.makedirs(ruta, exist_ok=True)
+        self.guardar_modelo(archivo)
+        return True
+
+
+
     # ===========================================================
     # 💾 GUARDAR RESULTADOS
     # ===========================================================
+    @instrumentar(filas=lambda resultado, modelo, *args, **kwargs:
+                  None if modelo.df_predicciones is None else len(modelo.df_predicciones))
     def guardar_predicciones(self, archivo="predicciones_mio.xlsx"):
 
         if self.df_predicciones is None:
             print("⚠️ No hay predicciones para guardar.")
             return
 
-        df_export = self.df_predicciones.copy()
+        # Copia superficial: las columnas que se cambian aquí no alteran df_predicciones
+        df_export = self.df_predicciones.copy(deep=False)
         df_export["Fecha"] = pd.to_datetime(df_export["Fecha"]).dt.date
 
-        df_export = df_export[df_export["Franja Horaria"] != "Desconocida"]
+        df_export = df_export[df_export["Franja Horaria"] != FRANJA_DESCONOCIDA]
 
         def extraer_hora_inicio(franja):
             try:
@@ -304,7 +1011,9 @@ class ModeloPredictivoMIO_sklearn:
             except:
                 return 0
 
-        df_export["Hora_Inicio"] = df_export["Franja Horaria"].apply(extraer_hora_inicio)
+        # Se calcula una vez por franja distinta, no por fila
+        horas = {f: extraer_hora_inicio(f) for f in df_export["Franja Horaria"].unique()}
+        df_export["Hora_Inicio"] = df_export["Franja Horaria"].map(horas).astype(int)
 
         df_export = df_export.sort_values(
             by=["Fecha", "Terminal", "Hora_Inicio"]
@@ -333,6 +1042,9 @@ if __name__ == "__main__":
 
     print("\nIniciando sistema predictivo del MIO...\n")
 
+    from pipeline_mio import asegurar_datos
+    asegurar_datos()
+
     modelo = ModeloPredictivoMIO_sklearn(
         usar_ultimo_mes=False,
         usar_random_forest=True
@@ -0,0 +1,139 @@
+import json
+import numpy as np
+import pandas as pd
+
+
+# CONTABILIDAD COMPACTA DE VALORES NULOS
+#
+# En lugar de una matriz entera del tamaño del dataset (df.isnull().astype(int)),
+# cada columna guarda un bitmap empaquetado (1 bit por fila) y se acumulan
+# conteos pequeños por terminal y por día.
+
+ARCHIVO_NULOS = "nulos_mio.npz"
+
+
+class RegistroNulos:
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        self.total_filas = 0
+
+        # Por bloque: (fila inicial, número de filas, {columna: bitmap empaquetado})
+        self.bloques = []
+
+        self.nulos_por_terminal = pd.DataFrame(columns=self.columnas, dtype="int64")
+        self.filas_por_terminal = pd.Series(dtype="int64")
+        self.nulos_por_dia = pd.DataFrame(columns=self.columnas, dtype="int64")
+        self.filas_por_dia = pd.Series(dtype="int64")
+
+    # ------------------------------
+    # REGISTRO
+    # ------------------------------
+    def registrar(self, df, desplazamiento=None):
+        """Registra los nulos de un bloque; por defecto se coloca a continuación del anterior"""
+        inicio = self.total_filas if desplazamiento is None else desplazamiento
+        n = len(df)
+
+        mascaras = {col: df[col].isna().to_numpy() for col in self.columnas}
+        self.bloques.append((inicio, n, {col: np.packbits(m) for col, m in mascaras.items()}))
+        self.total_filas = max(self.total_filas, inicio + n)
+
+        nulos = pd.DataFrame(mascaras, index=df.index)
+        if "Terminal" in df.columns:
+            self._acumular("terminal", nulos.groupby(df["Terminal"], observed=True).sum(),
+                           df.groupby("Terminal", observed=True).size())
+        if "Fecha" in df.columns:
+            fechas = pd.to_datetime(df["Fecha"]).dt.normalize()
+            self._acumular("dia", nulos.groupby(fechas).sum(), fechas.value_counts())
+
+    def _acumular(self, clave, nulos, filas):
+        nulos_actual = getattr(self, f"nulos_por_{clave}")
+        filas_actual = getattr(self, f"filas_por_{clave}")
+        setattr(self, f"nulos_por_{clave}", nulos_actual.add(nulos.astype("int64"), fill_value=0).astype("int64"))
+        setattr(self, f"filas_por_{clave}", filas_actual.add(filas.astype("int64"), fill_value=0).astype("int64"))
+
+    def combinar(self, otro):
+        """Une el registro de otro proceso (sus bloques ya traen su fila inicial)"""
+        self.bloques += otro.bloques
+        self.bloques.sort(key=lambda bloque: bloque[0])
+        self.total_filas = max(self.total_filas, otro.total_filas)
+        self._acumular("terminal", otro.nulos_por_terminal, otro.filas_por_terminal)
+        self._acumular("dia", otro.nulos_por_dia, otro.filas_por_dia)
+
+    # ------------------------------
+    # CONSULTAS
+    # ------------------------------
+    def posiciones(self, columna):
+        """Reconstruye bajo demanda las posiciones (filas) nulas de una columna"""
+        partes = [
+            inicio + np.flatnonzero(np.unpackbits(bitmaps[columna], count=n))
+            for inicio, n, bitmaps in self.bloques
+        ]
+        return np.concatenate(partes) if partes else np.array([], dtype=np.int64)
+
+    def resumen_por_columna(self):
+        nulos = pd.Series({
+            col: sum(int(np.unpackbits(bitmaps[col], count=n).sum()) for _, n, bitmaps in self.bloques)
+            for col in self.columnas
+        })
+        return pd.DataFrame({
+            "Nulos": nulos,
+            "Filas": self.total_filas,
+            "Tasa": nulos / max(self.total_filas, 1)
+        })
+
+    def resumen_por_terminal(self):
+        return self.nulos_por_terminal.div(self.filas_por_terminal, axis=0)
+
+    def resumen_por_dia(self):
+        return self.nulos_por_dia.div(self.filas_por_dia, axis=0)
+
+    def bytes_usados(self):
+        return sum(b.nbytes for _, _, bitmaps in self.bloques for b in bitmaps.values())
+
+    # ------------------------------
+    # PERSISTENCIA
+    # ------------------------------
+    def guardar(self, archivo=ARCHIVO_NULOS):
+        arreglos = {}
+        for i, (_, _, bitmaps) in enumerate(self.bloques):
+            for j, col in enumerate(self.columnas):
+                arreglos[f"bloque{i}_col{j}"] = bitmaps[col]
+
+        meta = {
+            "columnas": self.columnas,
+            "total_filas": self.total_filas,
+            "bloques": [(inicio, n) for inicio, n, _ in self.bloques],
+        }
+        np.savez_compressed(
+            archivo,
+            meta=np.array(json.dumps(meta)),
+            nulos_terminal=self.nulos_por_terminal.to_numpy(),
+            filas_terminal=self.filas_por_terminal.reindex(self.nulos_por_terminal.index).to_numpy(),
+            terminales=np.array([str(t) for t in self.nulos_por_terminal.index], dtype=str),
+            nulos_dia=self.nulos_por_dia.to_numpy(),
+            filas_dia=self.filas_por_dia.reindex(self.nulos_por_dia.index).to_numpy(),
+            dias=pd.DatetimeIndex(self.nulos_por_dia.index).to_numpy(dtype="datetime64[ns]"),
+            **arreglos
+        )
+
+    @classmethod
+    def cargar(cls, archivo=ARCHIVO_NULOS):
+        datos = np.load(archivo)
+        meta = json.loads(str(datos["meta"]))
+
+        registro = cls(meta["columnas"])
+        registro.total_filas = meta["total_filas"]
+        registro.bloques = [
+            (inicio, n, {col: datos[f"bloque{i}_col{j}"] for j, col in enumerate(registro.columnas)})
+            for i, (inicio, n) in enumerate(meta["bloques"])
+        ]
+
+        terminales = pd.Index(datos["terminales"], name="Terminal")
+        registro.nulos_por_terminal = pd.DataFrame(datos["nulos_terminal"], index=terminales, columns=registro.columnas)
+        registro.filas_por_terminal = pd.Series(datos["filas_terminal"], index=terminales)
+
+        dias = pd.DatetimeIndex(datos["dias"], name="Fecha")
+        registro.nulos_por_dia = pd.DataFrame(datos["nulos_dia"], index=dias, columns=registro.columnas)
+        registro.filas_por_dia = pd.Series(datos["filas_dia"], index=dias)
+        return registro
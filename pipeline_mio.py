@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+# PIPELINE DE VISIONCALI: ETAPAS EXPLÍCITAS (generar, limpiar, entrenar, predecir, exportar)
+#
+# Importar cualquier módulo del proyecto no ejecuta nada; cada etapa corre solo
+# cuando se la llama desde aquí (API) o desde la línea de comandos:
+#
+#   python pipeline_mio.py generar --filas 1000000
+#   python pipeline_mio.py limpiar --excel
+#   python pipeline_mio.py actualizar
+#   python pipeline_mio.py predecir --dias 5
+#   python pipeline_mio.py lotes --dias 365 --lote 100000
+#   python pipeline_mio.py todo
+#   python pipeline_mio.py arranque
+
+ARCHIVO_PREDICCIONES = "predicciones_mio.xlsx"
+
+MODULOS_PROYECTO = [
+    "almacen_mio", "limpieza_mio", "modelo_predictivo", "Reportes_finales",
+    "mapaMIO", "Graficas", "Graficas_solo_tablas", "Menu", "pipeline_mio", "benchmark_mio",
+    "instrumentacion_mio", "bosque_compacto_mio", "servicio_mio",
+    "cache_predicciones_mio", "backtesting_mio", "busqueda_mio",
+    "flota_mio"
+]
+
+
+# ============================================================
+# 🧪 ETAPAS
+# ============================================================
+def generar(num_datos=None, semilla=None, tamano_bloque=None, procesos=None):
+    """
+    Genera la simulación. Con tamano_bloque se genera y limpia por bloques
+    directamente al almacén limpio (memoria acotada) y no hace falta la etapa limpiar;
+    con procesos, además, los bloques se reparten entre varios núcleos.
+    """
+    import limpieza_mio
+    from almacen_mio import RUTA_DATOS_CRUDOS, borrar_almacen, guardar_particionado
+
+    num_datos = num_datos or limpieza_mio.num_datos
+    semilla = limpieza_mio.SEMILLA if semilla is None else semilla
+
+    if procesos:
+        return limpieza_mio.simular_en_paralelo(
+            num_datos=num_datos, tamano_bloque=tamano_bloque or 1_000_000,
+            semilla=semilla, procesos=procesos
+        )
+
+    if tamano_bloque:
+        return limpieza_mio.escribir_por_bloques(
+            num_datos=num_datos, tamano_bloque=tamano_bloque, semilla=semilla
+        )
+
+    df_terminales = limpieza_mio.generar_datos(num_datos, semilla)
+    borrar_almacen(RUTA_DATOS_CRUDOS)
+    guardar_particionado(df_terminales, RUTA_DATOS_CRUDOS)
+    return df_terminales
+
+
+def limpiar(df_terminales=None, exportar_excel=False, incremental=False):
+    """
+    Limpia los datos crudos (de memoria o del almacén crudo) y guarda el almacén limpio.
+    En modo incremental solo se leen y limpian los registros posteriores a la marca de agua.
+    """
+    import pandas as pd
+    import limpieza_mio
+    from almacen_mio import RUTA_DATOS_CRUDOS, cargar_datos_limpios
+
+    if incremental:
+        ultima_fecha, _ = limpieza_mio.cargar_marca_agua()
+        if df_terminales is None:
+            df_terminales = cargar_datos_limpios(
+                RUTA_DATOS_CRUDOS,
+                fecha_desde=None if ultima_fecha is None else ultima_fecha + pd.Timedelta(days=1)
+            )
+        return limpieza_mio.ObjetoDeDatos(df_terminales).limpiar_incremental()
+
+    if df_terminales is None:
+        df_terminales = cargar_datos_limpios(RUTA_DATOS_CRUDOS)
+
+    return limpieza_mio.limpiar_y_guardar(df_terminales, exportar=exportar_excel)
+
+
+def asegurar_datos():
+    """Genera y limpia los datos solo si todavía no existe el almacén limpio"""
+    from almacen_mio import existe_almacen
+
+    if not existe_almacen():
+        limpiar(generar())
+
+
+def entrenar(usar_ultimo_mes=False, usar_random_forest=True, usar_cache=True, nucleos=None,
+             backend=None, bajo_consumo=False, presupuesto_memoria_mb=None):
+    """
+    Con usar_cache solo se entrena si cambian los datos o los hiperparámetros.
+    nucleos es el presupuesto de CPU para entrenar ambos modelos a la vez (None = todos);
+    backend elige "random_forest", "hist_gb" o "lineal". Con presupuesto_memoria_mb
+    se falla antes de cada etapa que no quepa (MemoryError).
+    """
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    asegurar_datos()
+    modelo = ModeloPredictivoMIO_sklearn(
+        usar_ultimo_mes=usar_ultimo_mes,
+        usar_random_forest=usar_random_forest,
+        nucleos=nucleos,
+        backend=backend,
+        bajo_consumo=bajo_consumo,
+        presupuesto_memoria_mb=presupuesto_memoria_mb
+    )
+    if usar_cache:
+        modelo.cargar_o_entrenar()
+    else:
+        modelo.entrenar_modelos()
+    return modelo
+
+
+def actualizar(archivo_modelo=None, arboles_por_dia=10):
+    """
+    Actualización nocturna: carga el modelo guardado y le añade solo los días nuevos
+    del almacén. El resultado se guarda también en modelos_cache/ con la versión de
+    los datos actuales, que es donde lo buscan ejecutar_todo, el menú y el servicio.
+    Si aún no hay modelo guardado, o su backend no admite actualización incremental,
+    se entrena uno completo.
+    """
+    from modelo_predictivo import (ARCHIVO_MODELO, BACKENDS_INCREMENTALES, RUTA_CACHE_MODELOS,
+                                   ModeloPredictivoMIO_sklearn)
+
+    archivo_modelo = archivo_modelo or ARCHIVO_MODELO
+    asegurar_datos()
+
+    # Clave con la que el resto del sistema carga el modelo para los datos de hoy
+    servido = ModeloPredictivoMIO_sklearn(nucleos=None)
+    archivo_servido = os.path.join(RUTA_CACHE_MODELOS, f"{servido.version_modelo()}.joblib")
+
+    if os.path.exists(archivo_modelo):
+        # Solo el último mes en memoria (capacidades medianas y fechas futuras)
+        modelo = ModeloPredictivoMIO_sklearn(usar_ultimo_mes=True, nucleos=None)
+        modelo.cargar_modelo(archivo_modelo)
+
+        if modelo.backend in BACKENDS_INCREMENTALES:
+            actualizado = modelo.actualizar_incremental(arboles_por_dia=arboles_por_dia)
+            if actualizado:
+                modelo.guardar_modelo(archivo_modelo)
+            # Un modelo de otro backend no es el que se pide al cargar esa versión
+            if modelo.backend == servido.backend and (actualizado or not os.path.exists(archivo_servido)):
+                os.makedirs(RUTA_CACHE_MODELOS, exist_ok=True)
+                modelo.guardar_modelo(archivo_servido)
+            return modelo
+
+        print(f"El backend {modelo.backend} no admite actualización incremental; se reentrena completo.")
+
+    servido.cargar_o_entrenar()
+    servido.guardar_modelo(archivo_modelo)
+    return servido
+
+
+def predecir(modelo=None, dias_futuros=5, usar_cache=True):
+    """Con usar_cache solo se predicen los escenarios nuevos para esta versión del modelo"""
+    if modelo is None:
+        modelo = entrenar()
+
+    modelo.predecir(incluir_futuro=True, dias_futuros=dias_futuros, usar_cache=usar_cache)
+    return modelo
+
+
+def predecir_por_lotes(modelo=None, dias_futuros=365, tamano_lote=100_000, hilos=None):
+    """Predicción de horizontes largos con memoria acotada, escrita al almacén de predicciones"""
+    if modelo is None:
+        modelo = entrenar()
+
+    return modelo.predecir_por_lotes(dias_futuros=dias_futuros, tamano_lote=tamano_lote, hilos=hilos)
+
+
+def exportar(modelo, archivo=ARCHIVO_PREDICCIONES):
+    modelo.guardar_predicciones(archivo)
+    return archivo
+
+
+def _archivo_version(archivo):
+    return os.path.splitext(archivo)[0] + ".version.json"
+
+
+def predicciones_vigentes(version, dias_futuros, archivo=ARCHIVO_PREDICCIONES):
+    """True si el archivo de predicciones salió de esta misma versión del modelo"""
+    if not (os.path.exists(archivo) and os.path.exists(_archivo_version(archivo))):
+        return False
+    with open(_archivo_version(archivo), encoding="utf-8") as f:
+        registro = json.load(f)
+    return registro == {"version": version, "dias_futuros": dias_futuros}
+
+
+def ejecutar_todo(dias_futuros=5, archivo=ARCHIVO_PREDICCIONES, forzar=True):
+    """
+    Proceso completo: datos (si faltan), entrenamiento, predicción y exportación.
+    Con forzar=False no se hace nada si las predicciones existentes siguen vigentes.
+    """
+    from modelo_predictivo import ModeloPredictivoMIO_sklearn
+
+    asegurar_datos()
+    modelo = ModeloPredictivoMIO_sklearn(nucleos=None)
+    version = modelo.version_modelo()
+
+    if not forzar and predicciones_vigentes(version, dias_futuros, archivo):
+        print(f"Predicciones vigentes (versión {version}); no se regeneran.")
+        return archivo
+
+    modelo.cargar_o_entrenar()
+    predecir(modelo, dias_futuros=dias_futuros)
+
+    if modelo.df_predicciones is None:
+        print("⚠️ No se generaron predicciones.")
+        return None
+
+    exportar(modelo, archivo)
+    with open(_archivo_version(archivo), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "dias_futuros": dias_futuros}, f)
+    return archivo
+
+
+# ============================================================
+# ⏱️ TIEMPO DE ARRANQUE DE LOS MÓDULOS
+# ============================================================
+def medir_arranque(modulos=MODULOS_PROYECTO, repeticiones=3):
+    """Mide en un proceso nuevo cuánto tarda importar cada módulo (mejor de N)"""
+    resultados = {}
+
+    for modulo in modulos:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            proceso = subprocess.run(
+                [sys.executable, "-c", f"import {modulo}"],
+                capture_output=True,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+            tiempos.append(time.perf_counter() - inicio)
+
+        resultados[modulo] = min(tiempos) if proceso.returncode == 0 else None
+        estado = f"{resultados[modulo]:.3f} s" if resultados[modulo] is not None else "error al importar"
+        print(f"{modulo:<22} {estado}")
+
+    return resultados
+
+
+# ============================================================
+# 🧾 LÍNEA DE COMANDOS
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Etapas del pipeline predictivo del MIO")
+    etapas = parser.add_subparsers(dest="etapa", required=True)
+
+    p_generar = etapas.add_parser("generar", help="Simular datos de terminales")
+    p_generar.add_argument("--filas", type=int, default=None)
+    p_generar.add_argument("--semilla", type=int, default=None)
+    p_generar.add_argument("--bloque", type=int, default=None,
+                           help="Generar y limpiar por bloques de este tamaño")
+    p_generar.add_argument("--procesos", type=int, default=None,
+                           help="Generar los bloques en paralelo con este número de procesos")
+
+    p_limpiar = etapas.add_parser("limpiar", help="Limpiar los datos crudos")
+    p_limpiar.add_argument("--excel", action="store_true", help="Exportar también a Excel")
+    p_limpiar.add_argument("--incremental", action="store_true",
+                           help="Limpiar solo los registros posteriores a la marca de agua")
+
+    p_entrenar = etapas.add_parser("entrenar", help="Entrenar los modelos y mostrar métricas")
+    p_entrenar.add_argument("--nucleos", type=int, default=None,
+                            help="Núcleos a repartir entre ambos modelos (por defecto, todos)")
+    p_entrenar.add_argument("--backend", choices=["random_forest", "hist_gb", "lineal"], default=None)
+    p_entrenar.add_argument("--bajo-consumo", action="store_true",
+                            help="Tipos reducidos (float32/int16) y predicción por bloques")
+    p_entrenar.add_argument("--presupuesto-mb", type=float, default=None,
+                            help="Memoria máxima; se falla antes de la etapa que no quepa")
+
+    p_actualizar = etapas.add_parser("actualizar", help="Añadir al modelo guardado solo los días nuevos")
+    p_actualizar.add_argument("--arboles", type=int, default=10,
+                              help="Árboles (o iteraciones de boosting) nuevos por actualización")
+
+    ayudas = {
+        "predecir": "Entrenar, predecir y exportar predicciones",
+        "todo": "Regenerar los datos y ejecutar todas las etapas"
+    }
+    for nombre, ayuda in ayudas.items():
+        p = etapas.add_parser(nombre, help=ayuda)
+        p.add_argument("--dias", type=int, default=5)
+        p.add_argument("--archivo", default=ARCHIVO_PREDICCIONES)
+
+    p_lotes = etapas.add_parser("lotes", help="Predecir por lotes y escribir en el almacén de predicciones")
+    p_lotes.add_argument("--dias", type=int, default=365)
+    p_lotes.add_argument("--lote", type=int, default=100_000, help="Filas por lote")
+    p_lotes.add_argument("--hilos", type=int, default=None, help="Lotes predichos en paralelo")
+
+    etapas.add_parser("arranque", help="Medir el tiempo de importación de cada módulo")
+
+    args = parser.parse_args(argv)
+
+    if args.etapa == "generar":
+        generar(args.filas, args.semilla, args.bloque, args.procesos)
+    elif args.etapa == "limpiar":
+        limpiar(exportar_excel=args.excel, incremental=args.incremental)
+    elif args.etapa == "entrenar":
+        entrenar(usar_cache=False, nucleos=args.nucleos, backend=args.backend,
+                 bajo_consumo=args.bajo_consumo, presupuesto_memoria_mb=args.presupuesto_mb)
+    elif args.etapa == "actualizar":
+        actualizar(arboles_por_dia=args.arboles)
+    elif args.etapa == "predecir":
+        ejecutar_todo(args.dias, args.archivo)
+    elif args.etapa == "todo":
+        limpiar(generar())
+        ejecutar_todo(args.dias, args.archivo)
+    elif args.etapa == "lotes":
+        predecir_por_lotes(dias_futuros=args.dias, tamano_lote=args.lote, hilos=args.hilos)
+    elif args.etapa == "arranque":
+        medir_arranque()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# SERVICIO LOCAL DE PREDICCIÓN (MODELO CARGADO EN MEMORIA + MICRO-LOTES)
+#
+#   python servicio_mio.py servir --puerto 8765
+#   curl "http://127.0.0.1:8765/predecir?terminal=Centro&franja=05:30-09:00&fecha=2026-12-01"
+#   python servicio_mio.py carga --solicitudes 2000 --concurrencia 16
+#
+# Las consultas que llegan a la vez se agrupan en un solo lote para predict:
+# el hilo de lotes espera como mucho ESPERA_LOTE_MS desde la primera consulta
+# o hasta juntar TAMANO_MAXIMO_LOTE.
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+TAMANO_MAXIMO_LOTE = 256
+ESPERA_LOTE_MS = 2
+COLA_CONEXIONES = 128
+
+
+# ============================================================
+# 📦 MICRO-LOTES
+# ============================================================
+class LoteadorPredicciones:
+    """Un único hilo predice; las consultas concurrentes esperan su resultado en un Future"""
+
+    def __init__(self, modelo, tamano_maximo=TAMANO_MAXIMO_LOTE, espera_ms=ESPERA_LOTE_MS):
+        self.modelo = modelo
+        self.tamano_maximo = tamano_maximo
+        self.espera = espera_ms / 1000
+        self.cola = queue.Queue()
+        self.lotes_procesados = 0
+        self.consultas_procesadas = 0
+        self._hilo = threading.Thread(target=self._bucle, name="loteador-predicciones", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, terminal, franja, fecha):
+        futuro = Future()
+        self.cola.put(((terminal, franja, fecha), futuro))
+        return futuro
+
+    def predecir(self, terminal, franja, fecha, timeout=10):
+        return self.enviar(terminal, franja, fecha).result(timeout)
+
+    def _bucle(self):
+        import pandas as pd
+
+        while True:
+            pendientes = [self.cola.get()]
+            limite = time.perf_counter() + self.espera
+            while len(pendientes) < self.tamano_maximo:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(self.cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            consultas = pd.DataFrame(
+                [consulta for consulta, _ in pendientes],
+                columns=["Terminal", "Franja Horaria", "Fecha"]
+            )
+            # Cualquier fallo del lote va a sus consultas; el hilo sigue atendiendo
+            try:
+                df = self.modelo.predecir_consultas(consultas)
+                resultados = [
+                    {
+                        "terminal": fila["Terminal"],
+                        "franja": fila["Franja Horaria"],
+                        "fecha": fila["Fecha"].date().isoformat(),
+                        "capacidad_maxima": float(fila["Capacidad Máxima"]),
+                        "ocupacion": float(fila["Ocupacion"]),
+                        "personas_predichas": int(fila["Personas_Predichas"]),
+                        "prob_colapso": float(fila["Prob_Colapso"]),
+                        "estado_previsto": fila["Estado_Previsto"],
+                    }
+                    for fila in df.to_dict("records")
+                ]
+                if len(resultados) != len(pendientes):
+                    raise RuntimeError(f"Se esperaban {len(pendientes)} predicciones y hubo {len(resultados)}.")
+            except Exception as e:
+                for _, futuro in pendientes:
+                    futuro.set_exception(e)
+                continue
+
+            for (_, futuro), resultado in zip(pendientes, resultados):
+                futuro.set_result(resultado)
+
+            self.lotes_procesados += 1
+            self.consultas_procesadas += len(pendientes)
+
+
+# ============================================================
+# 🌐 API HTTP
+# ============================================================
+class ManejadorPredicciones(BaseHTTPRequestHandler):
+
+    loteador = None
+    terminales = set()
+    franjas = set()
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _validar(self, terminal, franja, fecha):
+        if terminal not in self.terminales:
+            return f"Terminal desconocida: '{terminal}'"
+        if franja not in self.franjas:
+            return f"Franja horaria desconocida: '{franja}'"
+        try:
+            time.strptime(fecha, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return f"Fecha inválida: '{fecha}' (formato AAAA-MM-DD)"
+        return None
+
+    def _predecir(self, consultas):
+        for consulta in consultas:
+            if not isinstance(consulta, dict):
+                return self._responder(400, {"error": f"Consulta inválida: {consulta!r} (se esperaba un objeto)"})
+            error = self._validar(consulta.get("terminal"), consulta.get("franja"), consulta.get("fecha"))
+            if error:
+                return self._responder(400, {"error": error})
+
+        futuros = [self.loteador.enviar(c["terminal"], c["franja"], c["fecha"]) for c in consultas]
+        try:
+            return [futuro.result(timeout=10) for futuro in futuros]
+        except Exception as e:
+            return self._responder(500, {"error": str(e)})
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        parametros = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+
+        if url.path == "/salud":
+            return self._responder(200, {
+                "estado": "ok",
+                "version": self.loteador.modelo.version_modelo(),
+                "lotes": self.loteador.lotes_procesados,
+                "consultas": self.loteador.consultas_procesadas,
+            })
+
+        if url.path == "/predecir":
+            resultado = self._predecir([parametros])
+            if isinstance(resultado, list):
+                self._responder(200, resultado[0])
+            return
+
+        self._responder(404, {"error": f"Ruta desconocida: {url.path}"})
+
+    def do_POST(self):
+        """POST /predecir con {"consultas": [{"terminal", "franja", "fecha"}, ...]}"""
+        if urllib.parse.urlparse(self.path).path != "/predecir":
+            return self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            consultas = json.loads(self.rfile.read(longitud))["consultas"]
+            if not isinstance(consultas, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return self._responder(400, {"error": "Se esperaba JSON con la lista 'consultas'."})
+
+        resultado = self._predecir(consultas)
+        if isinstance(resultado, list):
+            self._responder(200, {"predicciones": resultado})
+
+    def log_message(self, formato, *args):
+        # Sin una línea por consulta en la consola
+        pass
+
+
+def crear_servidor(modelo, host=HOST, puerto=PUERTO, **opciones_lote):
+    """Servidor HTTP (un hilo por conexión) con el modelo ya cargado"""
+    manejador = type("Manejador", (ManejadorPredicciones,), {
+        "loteador": LoteadorPredicciones(modelo, **opciones_lote),
+        "terminales": {str(t) for t in modelo.label_encoders["Terminal"].classes_},
+        "franjas": {str(f) for f in modelo.label_encoders["Franja Horaria"].classes_},
+    })
+    servidor = ThreadingHTTPServer((host, puerto), manejador, bind_and_activate=False)
+    # Con la cola por defecto (5) las ráfagas de conexiones esperan reintentos de ~1 s
+    servidor.request_queue_size = COLA_CONEXIONES
+    servidor.server_bind()
+    servidor.server_activate()
+    return servidor
+
+
+def servir(host=HOST, puerto=PUERTO, compacto=False):
+    """Carga (o entrena, si cambió la versión) el modelo una sola vez y atiende consultas"""
+    from pipeline_mio import asegurar_datos
+
+    asegurar_datos()
+
+    from modelo_predictivo import ARCHIVO_MODELO_COMPACTO, ModeloPredictivoMIO_sklearn
+
+    modelo = ModeloPredictivoMIO_sklearn(nucleos=None)
+    if compacto:
+        modelo.cargar_compacto(ARCHIVO_MODELO_COMPACTO)
+    else:
+        modelo.cargar_o_entrenar()
+
+    servidor = crear_servidor(modelo, host, puerto)
+    print(f"Servicio de predicción en http://{host}:{puerto}/predecir (Ctrl+C para detener)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+# ============================================================
+# 🏋️ PRUEBA DE CARGA
+# ============================================================
+def prueba_de_carga(url=f"http://{HOST}:{PUERTO}", solicitudes=2000, concurrencia=16, semilla=42):
+    """Lanza consultas GET concurrentes y mide la latencia (p50/p95/p99) y el rendimiento"""
+    import numpy as np
+    from esquema_mio import FRANJAS, TERMINALES
+
+    rng = np.random.default_rng(semilla)
+    fechas = [f"2027-{m:02d}-{d:02d}" for m in range(1, 13) for d in range(1, 29)]
+    consultas = [
+        urllib.parse.urlencode({
+            "terminal": TERMINALES[rng.integers(len(TERMINALES))],
+            "franja": FRANJAS[rng.integers(len(FRANJAS))],
+            "fecha": fechas[rng.integers(len(fechas))],
+        })
+        for _ in range(solicitudes)
+    ]
+
+    def consultar(parametros):
+        inicio = time.perf_counter()
+        with urllib.request.urlopen(f"{url}/predecir?{parametros}", timeout=30) as respuesta:
+            respuesta.read()
+            codigo = respuesta.status
+        return time.perf_counter() - inicio, codigo
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        resultados = list(ejecutor.map(consultar, consultas))
+    total = time.perf_counter() - inicio
+
+    latencias_ms = np.array([latencia for latencia, _ in resultados]) * 1000
+    errores = sum(codigo != 200 for _, codigo in resultados)
+    reporte = {
+        "solicitudes": solicitudes,
+        "concurrencia": concurrencia,
+        "errores": int(errores),
+        "segundos": total,
+        "solicitudes_por_s": solicitudes / total,
+        "p50_ms": float(np.percentile(latencias_ms, 50)),
+        "p95_ms": float(np.percentile(latencias_ms, 95)),
+        "p99_ms": float(np.percentile(latencias_ms, 99)),
+        "max_ms": float(latencias_ms.max()),
+    }
+
+    print(f"{solicitudes} solicitudes, concurrencia {concurrencia}: "
+          f"{reporte['solicitudes_por_s']:.0f} sol/s, p50 = {reporte['p50_ms']:.1f} ms, "
+          f"p95 = {reporte['p95_ms']:.1f} ms, p99 = {reporte['p99_ms']:.1f} ms, errores = {errores}")
+    return reporte
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local de predicción del MIO")
+    modos = parser.add_subparsers(dest="modo", required=True)
+
+    p_servir = modos.add_parser("servir", help="Iniciar el servicio HTTP")
+    p_servir.add_argument("--host", default=HOST)
+    p_servir.add_argument("--puerto", type=int, default=PUERTO)
+    p_servir.add_argument("--compacto", action="store_true", help="Usar el modelo compacto exportado")
+
+    p_carga = modos.add_parser("carga", help="Prueba de carga contra un servicio en marcha")
+    p_carga.add_argument("--url", default=f"http://{HOST}:{PUERTO}")
+    p_carga.add_argument("--solicitudes", type=int, default=2000)
+    p_carga.add_argument("--concurrencia", type=int, default=16)
+
+    args = parser.parse_args(argv)
+
+    if args.modo == "servir":
+        servir(args.host, args.puerto, args.compacto)
+    else:
+        prueba_de_carga(args.url, args.solicitudes, args.concurrencia)
+
+
+if __name__ == "__main__":
+    main()
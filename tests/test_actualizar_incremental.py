@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import limpieza_mio
+from modelo_predictivo import COLUMNAS_FEATURES, ModeloPredictivoMIO_sklearn
+
+
+@pytest.fixture(scope="module")
+def datos():
+    """Datos simulados y limpios, partidos en historia y un día nuevo pequeño.
+
+    Con pocos registros nuevos no aparecen todas las categorías ni todos los valores,
+    que es justo cuando reajustar codificadores o bins cambiaría lo ya aprendido.
+    """
+    df = limpieza_mio.ObjetoDeDatos(limpieza_mio.simular_terminales(4000)).limpiar_datos()
+    df = df.sort_values("Fecha", kind="stable")
+    corte = df["Fecha"].iloc[-20]
+    return df[df["Fecha"] < corte], df[df["Fecha"] >= corte]
+
+
+def _entrenar(backend, df_historia, **hiperparametros):
+    modelo = ModeloPredictivoMIO_sklearn(backend=backend, archivo_config=None, cargar_datos=False)
+    modelo.df = modelo._preparar_datos(df_historia)
+    for tarea in ("ocupacion", "colapso"):
+        modelo.hiperparametros[tarea].update(hiperparametros)
+    modelo.entrenar_modelos(paralelo=False)
+    return modelo
+
+
+def _matriz(modelo, df):
+    X = modelo._preparar_features(modelo._preparar_datos(df), entrenar=False)
+    return modelo._escalar(modelo.scaler_ocupacion, X[:, :len(COLUMNAS_FEATURES)])
+
+
+def test_hist_gb_conserva_iteraciones_originales(datos):
+    df_historia, df_nuevo = datos
+    modelo = _entrenar("hist_gb", df_historia, max_iter=10)
+    X = _matriz(modelo, df_historia)
+    antes = np.array(list(modelo.modelo_ocupacion.staged_predict(X)))
+
+    modelo.actualizar_incremental(df_nuevo=df_nuevo, arboles_por_dia=5)
+
+    despues = np.array(list(modelo.modelo_ocupacion.staged_predict(X)))[:len(antes)]
+    np.testing.assert_array_equal(antes, despues)
+
+
+def test_random_forest_conserva_arboles_que_siguen_en_la_ventana(datos):
+    df_historia, df_nuevo = datos
+    modelo = _entrenar("random_forest", df_historia, n_estimators=10, max_depth=8)
+    X = _matriz(modelo, df_historia)
+    originales = modelo.modelo_ocupacion.estimators_
+    antes = np.array([arbol.predict(X) for arbol in originales[5:]])
+
+    assert modelo.actualizar_incremental(df_nuevo=df_nuevo, arboles_por_dia=5)
+
+    arboles = modelo.modelo_ocupacion.estimators_
+    assert len(arboles) == 10
+    assert all(a is b for a, b in zip(arboles[:5], originales[5:]))
+    np.testing.assert_array_equal(antes, np.array([arbol.predict(X) for arbol in arboles[:5]]))